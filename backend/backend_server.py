@@ -2,19 +2,29 @@
 import os
 import sys
 import io
+import asyncio
+import hashlib
 import logging
+import multiprocessing
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from PIL import Image
+import numpy as np
+import orjson
 import uvicorn
-import config
+from config import config
 from services.cloudinary_service import CloudinaryImageService
 from services.pinecone_service import PineconeVectorService
 
@@ -31,45 +41,80 @@ feature_extractor = None
 cloudinary_service = None
 pinecone_service = None
 cache_service = None
+_extractor_lock = threading.Lock()
 
 
-def get_feature_extractor():
-    global feature_extractor
-    if feature_extractor is None:
-        extractor_type = os.getenv('FEATURE_EXTRACTOR_TYPE', 'resnet')
+def _load_feature_extractor():
+    """Build the extractor selected by FEATURE_EXTRACTOR_TYPE"""
+    extractor_type = os.getenv('FEATURE_EXTRACTOR_TYPE', 'resnet')
 
-        if extractor_type == 'vit':
-            try:
-                from ml.feature_extractors.vit_extractor import ViTFeatureExtractor
-                feature_extractor = ViTFeatureExtractor()
-                logger.info("Using ViT feature extractor")
-            except Exception as e:
-                logger.warning(f"ViT not available: {e}. Using ResNet.")
-                from ml.unified_feature_extractor import UnifiedFeatureExtractor
-                feature_extractor = UnifiedFeatureExtractor(
-                    feature_dim=config.FEATURE_DIMENSION,
-                    use_amp=True
-                )
-        elif extractor_type == 'ensemble':
-            try:
-                from ml.feature_extractors.ensemble_extractor import EnsembleFeatureExtractor
-                feature_extractor = EnsembleFeatureExtractor(
-                    feature_dim=config.FEATURE_DIMENSION
-                )
-                logger.info("Using Ensemble feature extractor")
-            except Exception as e:
-                logger.warning(f"Ensemble not available: {e}. Using ResNet.")
-                from ml.unified_feature_extractor import UnifiedFeatureExtractor
-                feature_extractor = UnifiedFeatureExtractor(
-                    feature_dim=config.FEATURE_DIMENSION,
-                    use_amp=True
-                )
-        else:
+    if extractor_type == 'vit':
+        try:
+            from ml.feature_extractors.vit_extractor import ViTFeatureExtractor
+            extractor = ViTFeatureExtractor()
+            logger.info("Using ViT feature extractor")
+        except Exception as e:
+            logger.warning(f"ViT not available: {e}. Using ResNet.")
+            from ml.unified_feature_extractor import UnifiedFeatureExtractor
+            extractor = UnifiedFeatureExtractor(
+                feature_dim=config.FEATURE_DIMENSION,
+                use_amp=True
+            )
+    elif extractor_type == 'ensemble':
+        try:
+            from ml.feature_extractors.ensemble_extractor import EnsembleFeatureExtractor
+            extractor = EnsembleFeatureExtractor(
+                feature_dim=config.FEATURE_DIMENSION
+            )
+            logger.info("Using Ensemble feature extractor")
+        except Exception as e:
+            logger.warning(f"Ensemble not available: {e}. Using ResNet.")
+            from ml.unified_feature_extractor import UnifiedFeatureExtractor
+            extractor = UnifiedFeatureExtractor(
+                feature_dim=config.FEATURE_DIMENSION,
+                use_amp=True
+            )
+    elif extractor_type == 'onnx':
+        try:
+            from ml.feature_extractors.onnx_extractor import ONNXFeatureExtractor
+            backbone = os.getenv('ONNX_BACKBONE', 'resnet')
+            default_path = 'vit_features.onnx' if backbone == 'vit' else 'resnet50_features.onnx'
+            extractor = ONNXFeatureExtractor(
+                model_path=os.getenv('ONNX_MODEL_PATH', default_path),
+                feature_dim=config.FEATURE_DIMENSION,
+                backbone=backbone
+            )
+            logger.info("Using ONNX Runtime feature extractor")
+        except Exception as e:
+            logger.warning(f"ONNX Runtime not available: {e}. Using ResNet.")
             from ml.unified_feature_extractor import UnifiedFeatureExtractor
-            feature_extractor = UnifiedFeatureExtractor(
+            extractor = UnifiedFeatureExtractor(
                 feature_dim=config.FEATURE_DIMENSION,
                 use_amp=True
             )
+    else:
+        from ml.unified_feature_extractor import UnifiedFeatureExtractor
+        extractor = UnifiedFeatureExtractor(
+            feature_dim=config.FEATURE_DIMENSION,
+            use_amp=True
+        )
+
+    # ONNX Runtime sessions handle precision and graph optimization themselves
+    if os.getenv('FEATURE_EXTRACTOR_QUANTIZE', '0') == '1' and hasattr(extractor, 'quantize_model'):
+        extractor.quantize_model()
+    if os.getenv('FEATURE_EXTRACTOR_JIT', '0') == '1' and hasattr(extractor, 'compile_model'):
+        extractor.compile_model()
+    return extractor
+
+
+def get_feature_extractor():
+    global feature_extractor
+    # Double-checked so concurrent first callers (event loop plus executor
+    # threads) never load the model twice
+    if feature_extractor is None:
+        with _extractor_lock:
+            if feature_extractor is None:
+                feature_extractor = _load_feature_extractor()
     return feature_extractor
 
 
@@ -100,7 +145,258 @@ def get_cache_service():
     return cache_service
 
 
-app = FastAPI(title='Quantum Image API', version='3.0.0')
+_last_ts_sec = 0
+_last_ts_str = ''
+_ts_lock = threading.Lock()
+
+
+def utc_timestamp():
+    """ISO-8601 UTC timestamp at one-second resolution, formatted once per second"""
+    global _last_ts_sec, _last_ts_str
+    now_s = int(time.time())
+    if now_s != _last_ts_sec:
+        with _ts_lock:
+            if now_s != _last_ts_sec:
+                _last_ts_str = datetime.utcfromtimestamp(now_s).isoformat() + 'Z'
+                _last_ts_sec = now_s
+    return _last_ts_str
+
+
+def read_upload(source):
+    """Return the bytes of an upload given as bytes or a seekable file object"""
+    if isinstance(source, (bytes, bytearray)):
+        return source
+    source.seek(0)
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except Exception:  # Package or libturbojpeg shared library missing
+    _turbojpeg = None
+
+
+def _jpeg_scaling_factor(width, height, min_side=256):
+    """Largest 1/8, 1/4 or 1/2 DCT downscale keeping the short side >= min_side"""
+    for denominator in (8, 4, 2):
+        if min(width, height) // denominator >= min_side:
+            return (1, denominator)
+    return None
+
+
+def decode_rgb(data):
+    """
+    Decode image bytes into an RGB uint8 HWC array
+
+    Runs in the decode process pool, so it returns an ndarray rather than
+    a PIL image to keep the result cheap to pickle back. JPEGs go through
+    libjpeg-turbo when PyTurboJPEG is installed.
+    """
+    if _turbojpeg is not None and data[:2] == b'\xff\xd8':
+        try:
+            width, height, _, _ = _turbojpeg.decode_header(data)
+            return _turbojpeg.decode(
+                data,
+                pixel_format=TJPF_RGB,
+                scaling_factor=_jpeg_scaling_factor(width, height)
+            )
+        except Exception as e:
+            logger.debug(f"TurboJPEG decode failed, using PIL: {e}")
+
+    image = Image.open(io.BytesIO(data))
+    # Let libjpeg downscale while decoding; the models only need ~256px input
+    image.draft('RGB', (256, 256))
+    return np.asarray(image.convert('RGB'))
+
+
+class BatchRunner:
+    """
+    Micro-batches concurrent feature extraction requests
+
+    Requests are queued and collected for up to ``max_wait`` seconds, then
+    run through the model in a single batched forward pass. Inference runs
+    on a thread pool and image decoding on a process pool (when given), so
+    the event loop stays responsive.
+    """
+
+    def __init__(self, max_batch_size=16, max_wait=0.008, max_workers=4):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.decode_pool = None
+        self.queue = None
+        self._task = None
+
+    def start(self, decode_pool=None):
+        if self._task is None:
+            self.decode_pool = decode_pool
+            self.queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                f"Batch runner started (max_batch={self.max_batch_size}, "
+                f"max_wait={self.max_wait * 1000:.0f}ms)"
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.executor.shutdown(wait=False)
+
+    async def decode(self, source):
+        """Decode ``source`` (bytes or file object) off the event loop"""
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.executor, read_upload, source)
+        array = await loop.run_in_executor(
+            self.decode_pool or self.executor, decode_rgb, data
+        )
+        return Image.fromarray(array)
+
+    async def submit_image(self, image):
+        """
+        Queue a decoded image and wait for its batched feature vector
+
+        Extractors that expose ``preprocess_image``/``extract_batch`` get the
+        image preprocessed here, per request, so the batch loop only stacks
+        tensors and runs the forward pass.
+        """
+        loop = asyncio.get_running_loop()
+        extractor = get_feature_extractor()
+        if hasattr(extractor, 'extract_batch'):
+            image = await loop.run_in_executor(
+                self.executor, extractor.preprocess_image, image
+            )
+        future = loop.create_future()
+        await self.queue.put((image, future))
+        return await future
+
+    async def submit(self, source):
+        """Decode ``source`` and wait for its batched feature vector"""
+        return await self.submit_image(await self.decode(source))
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            images = [image for image, _ in batch]
+            try:
+                features = await loop.run_in_executor(
+                    self.executor, self._extract, images
+                )
+            except Exception as e:
+                logger.error(f"Batch extraction error: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, features):
+                if not future.done():
+                    future.set_result(vector)
+
+    @staticmethod
+    def _extract(images):
+        extractor = get_feature_extractor()
+        # Already preprocessed by submit_image (arrays, or GPU tensors);
+        # float32 rows flow to the cache and Pinecone without list copies
+        if not isinstance(images[0], Image.Image):
+            return extractor.extract_batch_np(images)
+        if len(images) > 1 and hasattr(extractor, 'extract_batch_features'):
+            return extractor.extract_batch_features(images)
+        return [extractor.extract_features(image) for image in images]
+
+
+batch_runner = BatchRunner()
+
+
+async def get_or_extract_features(source, cache):
+    """
+    Look up features by exact content, then by perceptual hash, and only
+    run the model when both cache tiers miss
+
+    ``source`` is either the raw upload bytes or the upload's file object.
+    The hash is streamed from the file object, but decoding reads the whole
+    upload into bytes (see read_upload) so it can be sent to the decode pool.
+    """
+    if not cache:
+        return await batch_runner.submit(source)
+
+    # Hashing the upload and the Redis round-trips block, so they run
+    # on the default executor rather than the event loop
+    loop = asyncio.get_running_loop()
+    features = await loop.run_in_executor(None, cache.get_features, source)
+    if features is not None:
+        return features
+
+    from services.cache_service import compute_phash
+    image = await batch_runner.decode(source)
+    phash = await loop.run_in_executor(None, compute_phash, image)
+    features = await loop.run_in_executor(None, cache.get_features_phash, phash)
+    if features is None:
+        features = await batch_runner.submit_image(image)
+        # The two cache writes are independent Redis round-trips; overlap them
+        await asyncio.gather(
+            loop.run_in_executor(None, cache.set_features_phash, phash, features),
+            loop.run_in_executor(None, cache.set_features, source, features),
+        )
+    else:
+        await loop.run_in_executor(None, cache.set_features, source, features)
+    return features
+
+
+def format_matches(matches, with_category=True, exclude_id=None):
+    """Shape Pinecone matches into the API's similar_images entries"""
+    results = []
+    append = results.append
+    for m in matches:
+        match_id = m['id']
+        if match_id == exclude_id:
+            continue
+        get = m['metadata'].get
+        if with_category:
+            append({
+                'id': match_id,
+                'filename': get('filename'),
+                'category': get('category'),
+                'similarity': m['score'],
+                'image_url': get('cloudinary_url')
+            })
+        else:
+            append({
+                'id': match_id,
+                'filename': get('filename'),
+                'similarity': m['score'],
+                'image_url': get('cloudinary_url')
+            })
+    return results
+
+
+app = FastAPI(
+    title='Quantum Image API',
+    version='3.0.0',
+    default_response_class=ORJSONResponse
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],
@@ -108,6 +404,7 @@ app.add_middleware(
     allow_methods=['*'],
     allow_headers=['*']
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
 
 
 # Rate limiting
@@ -116,6 +413,70 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
+@app.on_event('startup')
+async def configure_default_executor():
+    """Size the thread pool used for blocking Pinecone/Cloudinary/Redis calls"""
+    app.state.io_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv('IO_THREADS', 32)),
+        thread_name_prefix='io'
+    )
+    asyncio.get_running_loop().set_default_executor(app.state.io_executor)
+
+
+@app.on_event('startup')
+async def init_services():
+    """Load the model and connect services up front instead of on first request"""
+    for name, getter in (
+        ('feature extractor', get_feature_extractor),
+        ('Cloudinary', get_cloudinary_service),
+        ('Pinecone', get_pinecone_service),
+        ('cache', get_cache_service),
+    ):
+        try:
+            # Off the event loop so model loading doesn't block other startup work
+            await asyncio.to_thread(getter)
+        except Exception as e:
+            logger.error(f"Failed to initialize {name} at startup: {e}")
+
+
+@app.on_event('startup')
+async def warmup_feature_extractor():
+    """Run one forward pass so the first request skips CUDA init and autotuning"""
+    try:
+        import torch
+        await asyncio.to_thread(
+            get_feature_extractor().extract_features, Image.new('RGB', (224, 224))
+        )
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+            # Autotune conv algorithms only once the model is loaded and warm
+            torch.backends.cudnn.benchmark = True
+        logger.info("Feature extractor warmed up")
+    except Exception as e:
+        logger.error(f"Feature extractor warmup failed: {e}")
+
+
+@app.on_event('startup')
+async def start_batch_runner():
+    # Every web worker owns a pool, so split the cores between workers
+    # (DECODE_WORKERS overrides) rather than spawning cpu_count() each
+    decode_workers = int(os.getenv('DECODE_WORKERS') or max(
+        1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY', '1'))
+    ))
+    # Spawn rather than fork: the parent already holds torch's thread pools
+    app.state.decode_pool = ProcessPoolExecutor(
+        max_workers=decode_workers,
+        mp_context=multiprocessing.get_context('spawn')
+    )
+    batch_runner.start(decode_pool=app.state.decode_pool)
+
+
+@app.on_event('shutdown')
+async def stop_batch_runner():
+    await batch_runner.stop()
+    app.state.decode_pool.shutdown(wait=False)
+
+
 @app.get('/')
 async def root():
     cache_stats = {}
@@ -136,37 +497,33 @@ async def root():
 async def upload_image(request: Request, file: UploadFile = File(...)):
     try:
         start_time = time.time()
-        contents = await file.read()
 
-        # Try cache first
+        # Try cache first, extract features if not cached
         cache = get_cache_service()
-        features = None
-        if cache:
-            features = cache.get_features(contents)
+        features = await get_or_extract_features(file.file, cache)
 
-        # Extract features if not cached
-        if features is None:
-            image = Image.open(io.BytesIO(contents)).convert('RGB')
-            features = get_feature_extractor().extract_features(image)
-
-            # Cache for future use
-            if cache:
-                cache.set_features(contents, features)
-
-        # Search similar images
-        matches = get_pinecone_service().search(
-            features,
-            top_k=10,
-            min_score=config.GOOD_CONFIDENCE_THRESHOLD
-        )
-
-        results = [{
-            'id': m['id'],
-            'filename': m['metadata'].get('filename'),
-            'category': m['metadata'].get('category'),
-            'similarity': m['score'],
-            'image_url': m['metadata'].get('cloudinary_url')
-        } for m in matches]
+        # Reuse results from a near-identical recent query, else search
+        loop = asyncio.get_running_loop()
+        results = generation = None
+        if cache:
+            # The generation is read before searching, so an upload that
+            # lands mid-search leaves these results stored as stale
+            results, generation = await asyncio.gather(
+                loop.run_in_executor(None, cache.get_search_results, features),
+                loop.run_in_executor(None, cache.search_generation)
+            )
+        if results is None:
+            matches = await loop.run_in_executor(None, partial(
+                get_pinecone_service().search,
+                features,
+                top_k=10,
+                min_score=config.GOOD_CONFIDENCE_THRESHOLD
+            ))
+            results = format_matches(matches)
+            if cache and generation is not None:
+                await loop.run_in_executor(
+                    None, cache.set_search_results, features, results, generation
+                )
 
         elapsed = time.time() - start_time
 
@@ -190,23 +547,28 @@ async def upload_and_store(
 ):
     try:
         start_time = time.time()
-        contents = await file.read()
 
         # Extract features with caching
         cache = get_cache_service()
-        features = None
-        if cache:
-            features = cache.get_features(contents)
+        features = await get_or_extract_features(file.file, cache)
 
-        if features is None:
-            image = Image.open(io.BytesIO(contents)).convert('RGB')
-            features = get_feature_extractor().extract_features(image)
-            if cache:
-                cache.set_features(contents, features)
+        loop = asyncio.get_running_loop()
+        pinecone = get_pinecone_service()
 
-        # Upload to Cloudinary
-        result = get_cloudinary_service().upload_image(
-            contents,
+        # Search similar while uploading to Cloudinary; the two are independent
+        search_future = loop.run_in_executor(None, partial(
+            pinecone.search,
+            features,
+            top_k=10,
+            category_filter=category,
+            min_score=config.GOOD_CONFIDENCE_THRESHOLD
+        ))
+
+        # Stream the spooled upload to Cloudinary
+        result = await loop.run_in_executor(
+            None,
+            get_cloudinary_service().upload_image_stream,
+            file.file,
             file.filename,
             category
         )
@@ -217,24 +579,26 @@ async def upload_and_store(
             'filename': file.filename,
             'category': category,
             'cloudinary_url': result['secure_url'],
-            'uploaded_at': datetime.utcnow().isoformat()
+            'uploaded_at': utc_timestamp()
         }
-        get_pinecone_service().upsert_vector(vector_id, features, metadata)
-
-        # Search similar
-        matches = get_pinecone_service().search(
+        upsert_future = loop.run_in_executor(
+            None,
+            pinecone.upsert_vector,
+            vector_id,
             features,
-            top_k=10,
-            category_filter=category,
-            min_score=config.GOOD_CONFIDENCE_THRESHOLD
+            metadata
         )
 
-        results = [{
-            'id': m['id'],
-            'filename': m['metadata'].get('filename'),
-            'similarity': m['score'],
-            'image_url': m['metadata'].get('cloudinary_url')
-        } for m in matches if m['id'] != vector_id]
+        matches, _ = await asyncio.gather(search_future, upsert_future)
+        if cache:
+            # Cached results for similar queries no longer include this image
+            await asyncio.get_running_loop().run_in_executor(None, cache.clear_search_results)
+
+        results = format_matches(
+            matches,
+            with_category=False,
+            exclude_id=vector_id
+        )
 
         elapsed = time.time() - start_time
 
@@ -252,13 +616,34 @@ async def upload_and_store(
         raise HTTPException(500, str(e))
 
 
-@app.get('/api/stats')
-async def get_stats():
-    stats = get_pinecone_service().get_statistics()
-    return {
+STATS_TTL_SECONDS = 5
+
+
+def _stats_bucket():
+    return int(time.monotonic() // STATS_TTL_SECONDS)
+
+
+@lru_cache(maxsize=1)
+def _cached_stats(bucket):
+    """Serialized stats body and its ETag, recomputed once per TTL bucket"""
+    body = orjson.dumps({
         'success': True,
-        'statistics': stats
+        'statistics': get_pinecone_service().get_statistics()
+    })
+    return body, f'"{hashlib.md5(body).hexdigest()[:16]}"'
+
+
+@app.get('/api/stats')
+async def get_stats(request: Request):
+    loop = asyncio.get_running_loop()
+    body, etag = await loop.run_in_executor(None, _cached_stats, _stats_bucket())
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'max-age={STATS_TTL_SECONDS}'
     }
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
 
 
 @app.get('/health')
@@ -267,4 +652,17 @@ async def health():
 
 
 if __name__ == '__main__':
-    uvicorn.run(app, host=config.HOST, port=config.PORT)
+    # Multiple workers need an import string rather than the app object
+    app_path = f"{__spec__.name if __spec__ else 'backend_server'}:app"
+    # Exported so each worker can size its decode pool (start_batch_runner)
+    workers = int(os.getenv('WEB_CONCURRENCY', max(1, (os.cpu_count() or 2) // 2)))
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    uvicorn.run(
+        app_path,
+        host=config.HOST,
+        port=config.PORT,
+        loop='auto',
+        http='auto',
+        workers=workers,
+        log_level='info'
+    )
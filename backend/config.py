@@ -23,6 +23,7 @@ class Config:
     # Feature extraction
     FEATURE_EXTRACTOR = 'resnet50'  # Options: 'resnet50', 'vgg16'
     FEATURE_DIMENSION = int(os.getenv('FEATURE_DIMENSION', '2048'))  # 2048 or 512
+    VECTOR_DTYPE = os.getenv('VECTOR_DTYPE', 'float16')  # Wire precision: float16 or float32
     
     # Quantum Configuration
     USE_QUANTUM_INSPIRED = os.getenv('USE_QUANTUM_INSPIRED', 'True').lower() == 'true'
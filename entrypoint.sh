@@ -6,10 +6,18 @@ echo "=================================="
 
 # Export environment variables
 export PYTHONUNBUFFERED=1
+export PYTHONPATH=/app:${PYTHONPATH}
+# Half the cores by default, as in main.py: every worker loads its own
+# model (and CUDA context). Workers also read this to size their decode pools
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(( $(nproc) / 2 > 1 ? $(nproc) / 2 : 1 ))}"
 
-# Start backend
+# Start backend (WEB_CONCURRENCY uvicorn workers under gunicorn)
 echo "Starting Backend Server..."
-python -m backend.backend_server &
+gunicorn backend_server:app \
+    --chdir backend \
+    -k uvicorn.workers.UvicornWorker \
+    -w "$WEB_CONCURRENCY" \
+    -b 0.0.0.0:8000 &
 BACKEND_PID=$!
 
 # Wait a moment for backend to start
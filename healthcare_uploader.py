@@ -5,13 +5,17 @@ Uploads healthcare images to Cloudinary and stores vectors in Pinecone
 
 import sys
 from pathlib import Path
-from PIL import Image
 import logging
 
 from config import config
 from services.cloudinary_service import CloudinaryImageService
 from services.pinecone_service import PineconeVectorService
-from ml.unified_feature_extractor import UnifiedFeatureExtractor
+from scripts.upload.common import (
+    UPLOAD_WORKERS,
+    get_feature_extractor,
+    iter_images,
+    upload_images,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -29,19 +33,23 @@ def upload_healthcare_images(image_dir: str = "data/testingimages/healthcare"):
     """
     Upload healthcare images to Cloudinary and Pinecone
     
+    Uses the shared upload pipeline (scripts/upload/common.py), so uploads
+    are rate limited and the number in flight is bounded.
+    
     Args:
         image_dir: Directory containing healthcare images
     """
     try:
         # Initialize components
         logger.info("Initializing Healthcare Uploader...")
-        feature_extractor = UnifiedFeatureExtractor(
+        feature_extractor = get_feature_extractor(
             feature_dim=config.FEATURE_DIMENSION,
             use_amp=True
         )
         logger.info("Feature extractor initialized")
         
-        cloudinary_service = CloudinaryImageService()
+        # One keep-alive connection per upload worker
+        cloudinary_service = CloudinaryImageService(pool_size=UPLOAD_WORKERS)
         pinecone_service = PineconeVectorService()
         logger.info("Cloud services initialized")
         
@@ -51,9 +59,7 @@ def upload_healthcare_images(image_dir: str = "data/testingimages/healthcare"):
             logger.error(f"Directory not found: {image_dir}")
             return
         
-        image_files = (list(image_path.glob("*.jpg")) + 
-                      list(image_path.glob("*.png")) + 
-                      list(image_path.glob("*.jpeg")))
+        image_files = iter_images(image_path)
         
         if not image_files:
             logger.warning(f"No images found in {image_dir}")
@@ -61,50 +67,13 @@ def upload_healthcare_images(image_dir: str = "data/testingimages/healthcare"):
         
         logger.info(f"Found {len(image_files)} healthcare images")
         
-        # Upload images
-        success_count = 0
-        error_count = 0
-        
-        for idx, image_file in enumerate(image_files, 1):
-            try:
-                logger.info(f"\n[{idx}/{len(image_files)}] Processing: {image_file.name}")
-                
-                # Load image
-                image = Image.open(image_file).convert('RGB')
-                
-                # Extract features
-                logger.info("Extracting features...")
-                features = feature_extractor.extract_features(image)
-                
-                # Read image data
-                with open(image_file, 'rb') as f:
-                    image_data = f.read()
-                
-                # Upload to Cloudinary
-                logger.info("Uploading to Cloudinary...")
-                result = cloudinary_service.upload_image(
-                    image_data,
-                    image_file.name,
-                    'healthcare'
-                )
-                
-                # Store in Pinecone
-                logger.info("Storing in Pinecone...")
-                vector_id = result['public_id'].replace('/', '_')
-                metadata = {
-                    'filename': image_file.name,
-                    'category': 'healthcare',
-                    'cloudinary_url': result['secure_url']
-                }
-                pinecone_service.upsert_vector(vector_id, features, metadata)
-                
-                logger.info(f"Upload successful: {result['public_id']}")
-                success_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing {image_file.name}: {e}")
-                error_count += 1
-                continue
+        success_count, error_count = upload_images(
+            image_files,
+            'healthcare',
+            feature_extractor,
+            cloudinary_service,
+            pinecone_service
+        )
         
         # Summary
         logger.info(f"\n{'='*60}")
@@ -3,24 +3,33 @@
 Main entry point for running the Quantum Image Retrieval backend server.
 
 Usage:
-    python main.py              # Start server
-    python -m uvicorn main:app --reload  # With reload
+    python main.py              # Start server (WEB_CONCURRENCY workers)
+    DEV=1 python main.py        # Single worker with auto-reload
 """
 
-import sys
+import os
 from pathlib import Path
 
-# Add project root to path
-sys.path.insert(0, str(Path(__file__).parent))
-
 import uvicorn
-from backend.backend_server import app
 
 if __name__ == "__main__":
+    dev = os.getenv("DEV", "0") == "1"
+    workers = 1 if dev else int(
+        os.getenv("WEB_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2))
+    )
+    # Exported so each worker can size its decode pool to its share of cores
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    # Import string so reload and multiple workers can re-import the app;
+    # app_dir puts backend/ on sys.path for its top-level `config` imports
     uvicorn.run(
-        app,
+        "backend_server:app",
+        app_dir=str(Path(__file__).parent / "backend"),
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=dev,
+        workers=workers,
+        loop="auto",
+        http="auto",
         log_level="info"
     )
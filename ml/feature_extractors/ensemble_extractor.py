@@ -7,10 +7,15 @@ import torch
 import numpy as np
 from PIL import Image
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Fusion weight and number of leading dimensions taken from each member
+FUSION_WEIGHTS = {"resnet": 0.5, "vit": 0.4, "clip": 0.1}
+FUSION_SEGMENT = 512
+
 
 class EnsembleFeatureExtractor:
     """Multi-model ensemble for robust feature extraction"""
@@ -20,6 +25,8 @@ class EnsembleFeatureExtractor:
         
         self.feature_dim = feature_dim
         self.models = {}
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._clip_preprocess = None
         
         from ml.unified_feature_extractor import UnifiedFeatureExtractor
         self.models["resnet"] = UnifiedFeatureExtractor(feature_dim=2048)
@@ -36,36 +43,57 @@ class EnsembleFeatureExtractor:
         if use_clip:
             try:
                 import clip
-                self.models["clip"], _ = clip.load("ViT-B/32", device="cuda" if torch.cuda.is_available() else "cpu")
+                self.models["clip"], self._clip_preprocess = clip.load("ViT-B/32", device=self.device)
                 logger.info("    CLIP loaded")
             except Exception as e:
                 logger.warning(f"    CLIP not available: {e}")
         
+        # One thread per member so their preprocessing and forward passes
+        # overlap; the ResNet member also runs on a per-thread CUDA stream
+        self._pool = ThreadPoolExecutor(
+            max_workers=len(self.models), thread_name_prefix="ensemble"
+        )
+        
         logger.info(f" Ensemble ready with {len(self.models)} models")
     
+    def quantize_model(self):
+        """Quantize the ResNet and ViT members of the ensemble"""
+        for name in ("resnet", "vit"):
+            if name in self.models:
+                self.models[name].quantize_model()
+    
+    def compile_model(self, mode="reduce-overhead"):
+        """Compile the ResNet and ViT members of the ensemble"""
+        for name in ("resnet", "vit"):
+            if name in self.models:
+                self.models[name].compile_model(mode=mode)
+    
     def extract_features(self, image):
         """Extract and fuse features from all models"""
         if isinstance(image, str):
             image = Image.open(image).convert("RGB")
         
-        all_features = []
-        
-        if "resnet" in self.models:
-            f_resnet = self.models["resnet"].extract_features(image)
-            all_features.append(np.array(f_resnet[:512]) * 0.5)
+        futures = {}
+        for name in self.models:
+            extract = (
+                self._extract_clip_features if name == "clip"
+                else self.models[name].extract_features_np
+            )
+            futures[name] = self._pool.submit(extract, image)
         
-        if "vit" in self.models:
-            f_vit = self.models["vit"].extract_features(image)
-            all_features.append(np.array(f_vit[:512]) * 0.4)
-        
-        if "clip" in self.models:
-            f_clip = self._extract_clip_features(image)
-            all_features.append(np.array(f_clip[:512]) * 0.1)
-        
-        combined = np.concatenate(all_features)[:self.feature_dim]
-        
-        if len(combined) < self.feature_dim:
-            combined = np.pad(combined, (0, self.feature_dim - len(combined)))
+        # Weighted segments written into one preallocated vector; anything
+        # past feature_dim is dropped and a shorter fusion stays zero-padded
+        combined = np.zeros(
+            max(self.feature_dim, FUSION_SEGMENT * len(futures)), dtype=np.float32
+        )
+        offset = 0
+        for name, future in futures.items():
+            segment = future.result()[:FUSION_SEGMENT]
+            np.multiply(
+                segment, FUSION_WEIGHTS[name], out=combined[offset:offset + len(segment)]
+            )
+            offset += len(segment)
+        combined = combined[:self.feature_dim]
         
         combined = combined / (np.linalg.norm(combined) + 1e-8)
         
@@ -73,11 +101,7 @@ class EnsembleFeatureExtractor:
     
     def _extract_clip_features(self, image):
         """Extract CLIP features"""
-        import clip
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        preprocess = clip.load("ViT-B/32", device=device)[1]
-        
-        image_input = preprocess(image).unsqueeze(0).to(device)
+        image_input = self._clip_preprocess(image).unsqueeze(0).to(self.device)
         with torch.no_grad():
             features = self.models["clip"].encode_image(image_input)
         
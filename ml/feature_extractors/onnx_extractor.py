@@ -0,0 +1,117 @@
+"""
+ONNX Runtime Feature Extractor
+Runs the ResNet-50 or ViT extractor through ONNX Runtime, preferring the
+TensorRT and CUDA execution providers when they are available
+"""
+
+import os
+import numpy as np
+from PIL import Image
+import logging
+
+from ml.unified_feature_extractor import (
+    IMAGENET_MEAN,
+    IMAGENET_STD,
+    normalize_hwc_to_chw,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ONNXFeatureExtractor:
+    """Extract ResNet-50 or ViT features with an ONNX Runtime (TensorRT) session"""
+    
+    def __init__(
+        self,
+        model_path="resnet50_features.onnx",
+        feature_dim=2048,
+        fp16=True,
+        backbone="resnet",
+    ):
+        """
+        Initialize the ONNX Runtime session, exporting the model first if needed
+        
+        Args:
+            model_path: Path of the exported ONNX model
+            feature_dim: Dimension of output features (ResNet projection)
+            fp16: Build TensorRT engines in FP16
+            backbone: "resnet" or "vit"
+        """
+        import onnxruntime as ort
+        from torchvision import transforms
+        
+        logger.info(f" Initializing ONNX Runtime extractor ({backbone}, {model_path})...")
+        self.backbone = backbone
+        
+        if not os.path.exists(model_path):
+            logger.info("   ONNX model not found, exporting from PyTorch...")
+            if backbone == "vit":
+                from ml.feature_extractors.vit_extractor import ViTFeatureExtractor
+                ViTFeatureExtractor().export_onnx(model_path)
+            else:
+                from ml.unified_feature_extractor import UnifiedFeatureExtractor
+                # Export in FP32; TensorRT picks reduced precision itself
+                UnifiedFeatureExtractor(feature_dim=feature_dim, use_amp=False).export_onnx(model_path)
+        
+        available = ort.get_available_providers()
+        providers = []
+        if "TensorrtExecutionProvider" in available:
+            providers.append((
+                "TensorrtExecutionProvider",
+                {
+                    "trt_fp16_enable": fp16,
+                    "trt_engine_cache_enable": True,
+                    "trt_engine_cache_path": os.path.dirname(os.path.abspath(model_path)),
+                },
+            ))
+        if "CUDAExecutionProvider" in available:
+            providers.append("CUDAExecutionProvider")
+        providers.append("CPUExecutionProvider")
+        
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        output_dim = self.session.get_outputs()[0].shape[-1]
+        self.feature_dim = output_dim if isinstance(output_dim, int) else feature_dim
+        
+        if backbone == "vit":
+            from transformers import ViTImageProcessor
+            from ml.feature_extractors.vit_extractor import DEFAULT_VIT_MODEL
+            self.processor = ViTImageProcessor.from_pretrained(DEFAULT_VIT_MODEL)
+        else:
+            self.resize_crop = transforms.Compose(
+                [transforms.Resize(256), transforms.CenterCrop(224)]
+            )
+        
+        logger.info(f" ONNX extractor ready (Providers: {self.session.get_providers()})")
+        logger.info(f"   Output: {self.feature_dim}D feature vectors")
+    
+    def _load(self, image):
+        if isinstance(image, str):
+            image = Image.open(image).convert("RGB")
+        elif not isinstance(image, Image.Image):
+            raise ValueError("Image must be PIL Image or path string")
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
+    
+    def extract_features(self, image):
+        """Extract features from a single image"""
+        return self.extract_batch_features([image])[0]
+    
+    def extract_batch_features(self, images):
+        """Extract features from multiple images in one session run"""
+        if self.backbone == "vit":
+            batch = self.processor(
+                images=[self._load(image) for image in images], return_tensors="np"
+            )["pixel_values"].astype(np.float32, copy=False)
+        else:
+            batch = np.empty((len(images), 3, 224, 224), dtype=np.float32)
+            for i, image in enumerate(images):
+                pixels = np.asarray(self.resize_crop(self._load(image)), dtype=np.uint8)
+                normalize_hwc_to_chw(pixels, IMAGENET_MEAN, IMAGENET_STD, batch[i])
+        
+        features = self.session.run(None, {self.input_name: batch})[0]
+        features = features.reshape(len(images), -1).astype(np.float32, copy=False)
+        features *= (1.0 / (np.sqrt(np.einsum("ij,ij->i", features, features)) + 1e-8))[:, None]
+        
+        return features.tolist()
@@ -12,11 +12,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_VIT_MODEL = "google/vit-base-patch16-224"
+
+
+class _CLSFeatures(nn.Module):
+    """Wraps ViTModel so its traced graph returns only the CLS-token features"""
+    
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, pixel_values):
+        return self.model(pixel_values)["last_hidden_state"][:, 0, :]
+
 
 class ViTFeatureExtractor:
     """Extract features using Vision Transformer"""
     
-    def __init__(self, model_name="google/vit-base-patch16-224", feature_dim=768):
+    def __init__(self, model_name=DEFAULT_VIT_MODEL, feature_dim=768):
         logger.info(f" Initializing Vision Transformer ({model_name})...")
         
         self.feature_dim = feature_dim
@@ -25,13 +38,88 @@ class ViTFeatureExtractor:
         self.model.eval()
         
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.dtype = torch.float32
         self.model = self.model.to(self.device)
         
         logger.info(f" ViT extractor ready (Device: {self.device})")
         logger.info(f"   Output: {feature_dim}D feature vectors")
     
+    def quantize_model(self):
+        """INT8 dynamic quantization of the Linear layers on CPU, FP16 on CUDA"""
+        if self.device.type == "cuda":
+            self.model = self.model.half()
+            self.dtype = torch.float16
+            logger.info(" ViT cast to FP16")
+        else:
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {nn.Linear}, dtype=torch.qint8
+            )
+            logger.info(" ViT Linear layers quantized to INT8 (dynamic)")
+    
+    def export_onnx(self, path, opset_version=17):
+        """
+        Export the CLS-token feature head to ONNX with a dynamic batch axis
+        
+        Args:
+            path: Output .onnx path
+            opset_version: ONNX opset to target
+        """
+        example = torch.zeros(1, 3, 224, 224, device=self.device, dtype=self.dtype)
+        torch.onnx.export(
+            _CLSFeatures(self.model),
+            example,
+            path,
+            input_names=["input"],
+            output_names=["features"],
+            dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=opset_version,
+        )
+        logger.info(f" ViT exported to ONNX: {path}")
+    
+    def compile_model(self, mode="reduce-overhead"):
+        """
+        Compile the ViT forward with torch.compile (TorchScript trace as
+        fallback) and warm it up so the first request doesn't pay for it
+        """
+        example = torch.zeros(1, 3, 224, 224, device=self.device, dtype=self.dtype)
+        eager_model = self.model
+        
+        try:
+            self.model = torch.compile(eager_model, mode=mode)
+            with torch.inference_mode():
+                self.model(example)
+            logger.info(f" ViT compiled with torch.compile (mode={mode})")
+            return
+        except Exception as e:
+            logger.warning(f" torch.compile failed: {e}. Trying TorchScript trace.")
+        
+        try:
+            # HF outputs are dicts, which a strict trace rejects
+            with torch.no_grad():
+                self.model = torch.jit.trace(eager_model, example, strict=False)
+                self.model(example)
+            logger.info(" ViT traced with TorchScript")
+        except Exception as e:
+            logger.warning(f" TorchScript trace failed: {e}. Using eager model.")
+            self.model = eager_model
+    
+    def _forward(self, images):
+        """CLS-token features for a list of PIL images, as a float32 array"""
+        pixel_values = self.processor(images=images, return_tensors="pt")["pixel_values"]
+        pixel_values = pixel_values.to(self.device, dtype=self.dtype)
+        
+        # Positional input so eager, compiled and traced models all accept it
+        with torch.inference_mode():
+            outputs = self.model(pixel_values)
+            hidden = outputs["last_hidden_state"]
+            return hidden[:, 0, :].float().cpu().numpy()
+    
     def extract_features(self, image):
         """Extract features from single image"""
+        return self.extract_features_np(image).tolist()
+    
+    def extract_features_np(self, image):
+        """Extract features from single image as a normalized float32 array"""
         if isinstance(image, str):
             image = Image.open(image).convert("RGB")
         elif not isinstance(image, Image.Image):
@@ -40,17 +128,10 @@ class ViTFeatureExtractor:
         if image.mode != "RGB":
             image = image.convert("RGB")
         
-        inputs = self.processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
+        features = self._forward([image])[0]
+        features /= np.linalg.norm(features) + 1e-8
         
-        features = outputs.last_hidden_state[:, 0, :].squeeze()
-        features = features.cpu().numpy()
-        features = features / (np.linalg.norm(features) + 1e-8)
-        
-        return features.tolist()
+        return features
     
     def extract_batch_features(self, images):
         """Extract features from multiple images"""
@@ -62,13 +143,7 @@ class ViTFeatureExtractor:
                 img = img.convert("RGB")
             pil_images.append(img)
         
-        inputs = self.processor(images=pil_images, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        
-        features = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-        features = features / (np.linalg.norm(features, axis=1, keepdims=True) + 1e-8)
+        features = self._forward(pil_images)
+        features *= (1.0 / (np.sqrt(np.einsum("ij,ij->i", features, features)) + 1e-8))[:, None]
         
         return features.tolist()
@@ -6,12 +6,21 @@ This module implements a production-grade quantum-enhanced similarity system
 combining classical deep learning with quantum computing techniques.
 """
 
+import math
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Union
 import logging
 
+from ml.quantum.ae_qip_kernels import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from ml.quantum.ae_qip_kernels import batched_similarity
+
 logger = logging.getLogger(__name__)
 
+# Table resolution for the amplitude estimation map
+AMPLITUDE_LUT_SIZE = 4096
+
 
 class QuantumKernels:
     """
@@ -32,20 +41,17 @@ class QuantumKernels:
         Returns:
             Fidelity score (0-1)
         """
-        # Create quantum state representations with phase
-        # Real part: classical features
-        # Imaginary part: quantum phase information
+        # Quantum states ψ = v + i·0.1·sqrt(1 - v²); expanding <ψ1|ψ2>
+        # gives real part v1·v2 + 0.01·s1·s2 and imaginary part
+        # 0.1·(v1·s2 - s1·v2), so no complex arrays are needed
         phase_factor = 0.1
-        quantum_state1 = v1 + 1j * np.sqrt(
-            np.maximum(0, 1 - v1**2)
-        ) * phase_factor
-        quantum_state2 = v2 + 1j * np.sqrt(
-            np.maximum(0, 1 - v2**2)
-        ) * phase_factor
+        s1 = np.sqrt(np.maximum(0, 1 - v1 * v1))
+        s2 = np.sqrt(np.maximum(0, 1 - v2 * v2))
+        real = v1 @ v2 + phase_factor**2 * (s1 @ s2)
+        imag = phase_factor * (v1 @ s2 - s1 @ v2)
         
-        # Calculate quantum overlap |<ψ1|ψ2>|²
-        overlap = np.abs(np.vdot(quantum_state1, quantum_state2))**2
-        fidelity = np.mean(overlap)
+        # Quantum overlap |<ψ1|ψ2>|²
+        fidelity = real * real + imag * imag
         
         return float(np.clip(fidelity, 0, 1))
     
@@ -80,6 +86,58 @@ class QuantumKernels:
         
         return float(np.clip(coherence, 0, 1))
     
+    @staticmethod
+    def phase_terms(v: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Phase terms of the quantum states ψ = v + i·a
+        
+        Args:
+            v: Normalized vector, or a matrix of normalized rows
+            
+        Returns:
+            (a, cos, sin): a = 0.1·sqrt(1 - v²) and the cosine/sine of
+            each element's phase angle
+        """
+        a = 0.1 * np.sqrt(np.maximum(0, 1 - v * v))
+        magnitude = np.sqrt(v * v + a * a)
+        return a, v / magnitude, a / magnitude
+    
+    @staticmethod
+    def fused_all(v1: np.ndarray, v2: np.ndarray) -> Tuple[float, float, float]:
+        """
+        Classical, quantum fidelity and phase coherence scores in one pass
+        
+        Shares the sqrt(1 - v²) phase terms between the kernels instead of
+        rebuilding the quantum states for each one.
+        
+        Args:
+            v1: First normalized vector
+            v2: Second normalized vector
+            
+        Returns:
+            (classical, fidelity, phase_coherence), each in 0-1
+        """
+        phase_factor = 0.1
+        a1 = phase_factor * np.sqrt(np.maximum(0, 1 - v1 * v1))
+        a2 = phase_factor * np.sqrt(np.maximum(0, 1 - v2 * v2))
+        dot = float(v1 @ v2)
+        
+        # Classical cosine similarity mapped to [0, 1]
+        classical = (dot + 1) / 2
+        
+        # |<ψ1|ψ2>|² (see quantum_fidelity_kernel)
+        real = dot + float(a1 @ a2)
+        imag = float(v1 @ a2 - a1 @ v2)
+        fidelity = float(np.clip(real * real + imag * imag, 0, 1))
+        
+        # cos(angle(ψ1) - angle(ψ2)) = (v1·v2 + a1·a2) / (|ψ1|·|ψ2|)
+        # per element, which avoids arctan2 and cos
+        magnitude = np.sqrt((v1 * v1 + a1 * a1) * (v2 * v2 + a2 * a2))
+        coherence = float(np.mean((v1 * v2 + a1 * a2) / magnitude))
+        phase_coherence = float(np.clip((coherence + 1) / 2, 0, 1))
+        
+        return classical, fidelity, phase_coherence
+    
     @staticmethod
     def quantum_entanglement_measure(
         v1: np.ndarray,
@@ -97,25 +155,12 @@ class QuantumKernels:
         Returns:
             Entanglement measure (0-1)
         """
-        # Calculate correlation matrix
-        corr_matrix = np.outer(v1, v2)
-        
-        # Compute singular values (Schmidt coefficients)
-        singular_vals = np.linalg.svd(corr_matrix, compute_uv=False)
-        
-        # Normalize
-        singular_vals = singular_vals / (np.sum(singular_vals) + 1e-10)
-        
-        # Calculate entanglement entropy
-        entropy = -np.sum(
-            singular_vals * np.log(singular_vals + 1e-10)
-        )
-        
-        # Normalize to [0, 1]
-        max_entropy = np.log(len(singular_vals))
-        entanglement = entropy / (max_entropy + 1e-10)
-        
-        return float(np.clip(entanglement, 0, 1))
+        # The correlation matrix np.outer(v1, v2) is a product state of
+        # rank one: its only nonzero Schmidt coefficient is ||v1||·||v2||,
+        # so the normalized spectrum is [1, 0, ..., 0] and the entropy is
+        # exactly zero. Return that directly instead of building a D×D
+        # matrix and running an O(D³) SVD to rediscover it.
+        return 0.0
 
 
 class AmplitudeEstimation:
@@ -135,6 +180,16 @@ class AmplitudeEstimation:
         self.n_precision_qubits = n_precision_qubits
         self.precision = 2 ** n_precision_qubits
         
+        # The enhancement is a fixed smooth map of combined ∈ [0, 1], so it
+        # is tabulated once and linearly interpolated per call
+        self._lut_x = np.linspace(0, 1, AMPLITUDE_LUT_SIZE + 1)
+        self._lut = np.clip(
+            np.sin(
+                np.arcsin(np.sqrt(self._lut_x)) * (1 + 1 / self.precision)
+            ) ** 2,
+            0, 1
+        )
+        
     def estimate_amplitude(
         self,
         classical_similarity: float,
@@ -143,7 +198,10 @@ class AmplitudeEstimation:
         """
         Estimate amplitude using quantum amplitude estimation
         
-        Simulates QAE to enhance similarity precision
+        Simulates QAE to enhance similarity precision: the combined score
+        is mapped to θ = arcsin(sqrt(combined)), scaled by the precision
+        factor (1 + 1/2^n), and converted back with sin²(θ). The map is
+        read from a precomputed table.
         
         Args:
             classical_similarity: Classical cosine similarity
@@ -155,22 +213,22 @@ class AmplitudeEstimation:
         # Combine classical and quantum information
         combined = (classical_similarity + quantum_fidelity) / 2
         
-        # Simulate quantum amplitude estimation
-        # In true quantum: uses Grover iterations
-        # Here: statistical enhancement with precision factor
-        
-        # Add quantum enhancement factor
-        theta = np.arcsin(np.sqrt(combined))
-        
-        # Simulate measurement precision improvement
-        # QAE provides quadratic speedup in precision
-        precision_factor = 1 / self.precision
-        enhanced_theta = theta * (1 + precision_factor)
-        
-        # Convert back to probability
-        enhanced_similarity = np.sin(enhanced_theta) ** 2
+        # Linear interpolation between the two nearest table entries
+        pos = min(max(float(combined), 0.0), 1.0) * AMPLITUDE_LUT_SIZE
+        i = min(int(pos), AMPLITUDE_LUT_SIZE - 1)
+        frac = pos - i
+        enhanced_similarity = self._lut[i] + frac * (self._lut[i + 1] - self._lut[i])
         
-        return float(np.clip(enhanced_similarity, 0, 1))
+        return float(enhanced_similarity)
+    
+    def estimate_amplitude_batch(
+        self,
+        classical_similarity: np.ndarray,
+        quantum_fidelity: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized ``estimate_amplitude`` over arrays of scores"""
+        combined = (classical_similarity + quantum_fidelity) / 2
+        return np.interp(combined, self._lut_x, self._lut)
 
 
 class AEQIPAlgorithm:
@@ -219,6 +277,13 @@ class AEQIPAlgorithm:
             self.n_precision_qubits
         )
         
+        # True quantum mode: circuit template and simulator, built once
+        self._circuit = None
+        self._angles = None
+        self._simulator = None
+        if not use_quantum_inspired:
+            self._build_quantum_circuit()
+        
         mode = 'inspired' if use_quantum_inspired else 'quantum'
         logger.info(
             f"AE-QIP v3.0.0 initialized: "
@@ -263,22 +328,12 @@ class AEQIPAlgorithm:
         Returns:
             Dictionary with similarity components
         """
-        v1 = np.array(features1)
-        v2 = np.array(features2)
-        
-        # Normalize
-        v1_norm = v1 / (np.linalg.norm(v1) + 1e-10)
-        v2_norm = v2 / (np.linalg.norm(v2) + 1e-10)
+        v1_norm = self._normalize(features1)
+        v2_norm = self._normalize(features2)
         
         # Calculate components
-        classical_sim = float(np.dot(v1_norm, v2_norm))
-        classical_sim = (classical_sim + 1) / 2
-        
-        quantum_fidelity = self.kernels.quantum_fidelity_kernel(
-            v1_norm, v2_norm
-        )
-        phase_coherence = self.kernels.phase_coherence_kernel(
-            v1_norm, v2_norm
+        classical_sim, quantum_fidelity, phase_coherence = (
+            self.kernels.fused_all(v1_norm, v2_norm)
         )
         
         # Amplitude estimation
@@ -315,47 +370,35 @@ class AEQIPAlgorithm:
         
         return result
     
-    def _quantum_inspired_similarity(
+    @staticmethod
+    def _normalize(features: List[float]) -> np.ndarray:
+        """Convert a feature list to an L2-normalized float32 array"""
+        v = np.asarray(features, dtype=np.float32)
+        # Scalar sqrt of a BLAS dot is cheaper than np.linalg.norm per call
+        return v * (1.0 / (math.sqrt(float(v @ v)) + 1e-10))
+    
+    def calculate_similarity_arr(
         self,
-        f1: List[float],
-        f2: List[float]
+        v1_norm: np.ndarray,
+        v2_norm: np.ndarray
     ) -> float:
         """
-        Fast quantum-inspired similarity calculation
+        Quantum-inspired similarity for already L2-normalized vectors
         
-        Combines:
-        - Classical cosine similarity (70%)
-        - Quantum fidelity kernel (20%)
-        - Phase coherence kernel (10%)
-        - Amplitude estimation enhancement
+        Fast path for callers that keep features as float32 arrays (e.g.
+        rows of a gallery matrix); skips list conversion and normalization.
         
         Args:
-            f1: First feature vector
-            f2: Second feature vector
+            v1_norm: First normalized float32 vector
+            v2_norm: Second normalized float32 vector
             
         Returns:
             Similarity score (0-1)
         """
-        # Convert to numpy
-        v1 = np.array(f1)
-        v2 = np.array(f2)
-        
-        # Normalize vectors
-        v1_norm = v1 / (np.linalg.norm(v1) + 1e-10)
-        v2_norm = v2 / (np.linalg.norm(v2) + 1e-10)
-        
-        # 1. Classical cosine similarity (70%)
-        classical_sim = np.dot(v1_norm, v2_norm)
-        classical_sim = (classical_sim + 1) / 2
-        
-        # 2. Quantum fidelity kernel (20%)
-        quantum_fidelity = self.kernels.quantum_fidelity_kernel(
-            v1_norm, v2_norm
-        )
-        
-        # 3. Phase coherence kernel (10%)
-        phase_coherence = self.kernels.phase_coherence_kernel(
-            v1_norm, v2_norm
+        # 1-3. Classical cosine (70%), quantum fidelity (20%) and
+        # phase coherence (10%) in one pass
+        classical_sim, quantum_fidelity, phase_coherence = (
+            self.kernels.fused_all(v1_norm, v2_norm)
         )
         
         # Combine with weights
@@ -375,9 +418,168 @@ class AEQIPAlgorithm:
         final_similarity = 0.8 * combined_similarity + 0.2 * ae_similarity
         
         # Ensure in [0, 1] range
-        final_similarity = np.clip(final_similarity, 0, 1)
+        return float(np.clip(final_similarity, 0, 1))
+    
+    def build_index(
+        self,
+        features_list: Union[List[List[float]], np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Build a gallery index: normalized features plus their phase terms
+        
+        Everything is stored structure-of-arrays as contiguous (N, D)
+        float32 matrices for calculate_similarity_batch. Build once and
+        reuse it across queries.
         
-        return float(final_similarity)
+        Not used by the backend, whose retrieval is served by Pinecone;
+        this is for offline or gallery-style callers of AE-QIP.
+        
+        Args:
+            features_list: N feature vectors, as lists or an (N, D) array
+            
+        Returns:
+            Dictionary with 'vectors', 'phase', 'cos' and 'sin' matrices
+        """
+        vectors = np.array(features_list, dtype=np.float32, order='C')
+        vectors *= (1.0 / (np.sqrt(np.einsum('ij,ij->i', vectors, vectors)) + 1e-10))[:, None]
+        phase, cos, sin = self.kernels.phase_terms(vectors)
+        return {'vectors': vectors, 'phase': phase, 'cos': cos, 'sin': sin}
+    
+    def calculate_similarity_batch(
+        self,
+        query: List[float],
+        gallery
+    ) -> np.ndarray:
+        """
+        Quantum-inspired similarity of one query against a whole gallery
+        
+        Every kernel reduces to matrix-vector products over the gallery
+        (or one fused Numba pass). Scores match calculate_similarity per
+        row. Like build_index, this is not on the backend's search path.
+        
+        Args:
+            query: Query feature vector
+            gallery: (N, D) feature matrix, or the output of build_index
+            
+        Returns:
+            (N,) array of similarity scores (0-1)
+        """
+        if not isinstance(gallery, dict):
+            gallery = self.build_index(gallery)
+        q = self._normalize(query)
+        q_phase, q_cos, q_sin = self.kernels.phase_terms(q)
+        vectors = gallery['vectors']
+        phase = gallery['phase']
+        
+        if NUMBA_AVAILABLE:
+            # One fused parallel pass per row, no (N,) temporaries
+            return batched_similarity(
+                q, q_phase, q_cos, q_sin,
+                vectors, phase, gallery['cos'], gallery['sin'],
+                self.amplitude_estimator._lut,
+                np.empty(vectors.shape[0]),
+            )
+        
+        # Classical cosine similarity
+        dot = vectors @ q
+        classical = (dot + 1) / 2
+        
+        # Quantum fidelity |<ψg|ψq>|²
+        real = dot + phase @ q_phase
+        imag = vectors @ q_phase - phase @ q
+        fidelity = np.clip(real * real + imag * imag, 0, 1)
+        
+        # Phase coherence: mean of cos(θg - θq)
+        coherence = (gallery['cos'] @ q_cos + gallery['sin'] @ q_sin) / q.shape[0]
+        phase_coherence = np.clip((coherence + 1) / 2, 0, 1)
+        
+        combined = 0.70 * classical + 0.20 * fidelity + 0.10 * phase_coherence
+        ae_similarity = self.amplitude_estimator.estimate_amplitude_batch(
+            classical, fidelity
+        )
+        return np.clip(0.8 * combined + 0.2 * ae_similarity, 0, 1)
+    
+    def _quantum_inspired_similarity(
+        self,
+        f1: List[float],
+        f2: List[float]
+    ) -> float:
+        """
+        Fast quantum-inspired similarity calculation
+        
+        Combines:
+        - Classical cosine similarity (70%)
+        - Quantum fidelity kernel (20%)
+        - Phase coherence kernel (10%)
+        - Amplitude estimation enhancement
+        
+        Args:
+            f1: First feature vector
+            f2: Second feature vector
+            
+        Returns:
+            Similarity score (0-1)
+        """
+        return self.calculate_similarity_arr(
+            self._normalize(f1), self._normalize(f2)
+        )
+    
+    def _build_quantum_circuit(self):
+        """
+        Build the parameterized 11-qubit circuit and the Aer simulator
+        
+        Only the encoding angles change between calls, so they are circuit
+        parameters bound per call instead of rebuilding the circuit.
+        """
+        try:
+            from qiskit import QuantumCircuit, QuantumRegister
+            from qiskit import ClassicalRegister
+            from qiskit.circuit import ParameterVector
+            from qiskit_aer import AerSimulator
+        except ImportError:
+            logger.warning(
+                "Qiskit not available, using quantum-inspired mode"
+            )
+            return
+        
+        # Create quantum registers
+        encoding_qreg = QuantumRegister(
+            self.n_encoding_qubits,
+            'encoding'
+        )
+        control_qreg = QuantumRegister(
+            self.n_control_qubits,
+            'control'
+        )
+        auxiliary_qreg = QuantumRegister(
+            self.n_precision_qubits,
+            'auxiliary'
+        )
+        creg = ClassicalRegister(self.n_precision_qubits, 'measure')
+        
+        # Create circuit
+        qc = QuantumCircuit(
+            encoding_qreg,
+            control_qreg,
+            auxiliary_qreg,
+            creg
+        )
+        
+        # Feature encoding on encoding qubits
+        self._angles = ParameterVector('angle', self.n_encoding_qubits)
+        for i in range(self.n_encoding_qubits):
+            qc.ry(2 * self._angles[i], encoding_qreg[i])
+        
+        # Apply quantum amplitude estimation
+        # (Simplified - full implementation would use Grover iterations)
+        qc.h(auxiliary_qreg)
+        qc.h(control_qreg)
+        
+        # Measure auxiliary qubits
+        qc.measure(auxiliary_qreg, creg)
+        
+        self._circuit = qc
+        self._simulator = AerSimulator()
     
     def _true_quantum_similarity(
         self,
@@ -399,64 +601,32 @@ class AEQIPAlgorithm:
         Returns:
             Similarity score (0-1)
         """
+        if self._circuit is None:
+            return self._quantum_inspired_similarity(f1, f2)
+        
         try:
-            from qiskit import QuantumCircuit, QuantumRegister
-            from qiskit import ClassicalRegister
-            from qiskit_aer import AerSimulator
-            
-            # Create quantum registers
-            encoding_qreg = QuantumRegister(
-                self.n_encoding_qubits,
-                'encoding'
-            )
-            control_qreg = QuantumRegister(
-                self.n_control_qubits,
-                'control'
-            )
-            auxiliary_qreg = QuantumRegister(
-                self.n_precision_qubits,
-                'auxiliary'
-            )
-            creg = ClassicalRegister(self.n_precision_qubits, 'measure')
-            
-            # Create circuit
-            qc = QuantumCircuit(
-                encoding_qreg,
-                control_qreg,
-                auxiliary_qreg,
-                creg
-            )
-            
             # Encode features (simplified for speed)
-            v1 = np.array(f1)
-            v2 = np.array(f2)
-            v1_norm = v1 / (np.linalg.norm(v1) + 1e-10)
-            v2_norm = v2 / (np.linalg.norm(v2) + 1e-10)
-            
-            # Feature encoding on encoding qubits
-            for i in range(min(self.n_encoding_qubits, len(v1_norm))):
-                angle = np.arcsin(v1_norm[i]) if abs(v1_norm[i]) <= 1 else 0
-                qc.ry(2 * angle, encoding_qreg[i])
-            
-            # Apply quantum amplitude estimation
-            # (Simplified - full implementation would use Grover iterations)
-            qc.h(auxiliary_qreg)
-            qc.h(control_qreg)
-            
-            # Measure auxiliary qubits
-            qc.measure(auxiliary_qreg, creg)
+            v1_norm = self._normalize(f1)
+            angles = np.zeros(self.n_encoding_qubits)
+            head = v1_norm[:self.n_encoding_qubits]
+            angles[:len(head)] = np.arcsin(np.clip(head, -1, 1))
+            qc = self._circuit.assign_parameters(
+                dict(zip(self._angles, angles))
+            )
             
             # Simulate
-            simulator = AerSimulator()
-            result = simulator.run(qc, shots=1024).result()
+            result = self._simulator.run(qc, shots=1024).result()
             counts = result.get_counts()
             
             # Extract similarity from measurement
-            total_shots = sum(counts.values())
-            weighted_sum = sum(
-                int(bitstring, 2) * count
-                for bitstring, count in counts.items()
+            outcomes = np.fromiter(
+                (int(bitstring, 2) for bitstring in counts),
+                dtype=np.int64,
+                count=len(counts)
             )
+            shots = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+            total_shots = int(shots.sum())
+            weighted_sum = int(outcomes @ shots)
             
             similarity = weighted_sum / (
                 total_shots * self.amplitude_estimator.precision
@@ -464,11 +634,6 @@ class AEQIPAlgorithm:
             
             return float(np.clip(similarity, 0, 1))
             
-        except ImportError:
-            logger.warning(
-                "Qiskit not available, using quantum-inspired mode"
-            )
-            return self._quantum_inspired_similarity(f1, f2)
         except Exception as e:
             logger.error(f"Quantum simulation error: {e}")
             return self._quantum_inspired_similarity(f1, f2)
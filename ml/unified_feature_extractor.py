@@ -3,15 +3,85 @@ Unified Feature Extractor using ResNet-50
 Extracts 512D feature vectors from images for high-quality similarity matching
 """
 
+import contextlib
 import torch
 import torch.nn as nn
 from torchvision import models, transforms
 from PIL import Image
 import numpy as np
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    from torchvision.transforms import v2
+
+    TRANSFORMS_V2_AVAILABLE = True
+except ImportError:
+    TRANSFORMS_V2_AVAILABLE = False
+
+try:
+    from nvidia.dali import fn, pipeline_def, types
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator, LastBatchPolicy
+
+    DALI_AVAILABLE = True
+except ImportError:
+    DALI_AVAILABLE = False
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def normalize_hwc_to_chw(img_u8, mean, std, out):
+        """Fused /255, mean/std normalization and HWC -> CHW in one pass"""
+        h, w, _ = img_u8.shape
+        for y in prange(h):
+            for c in range(3):
+                scale = 1.0 / (255.0 * std[c])
+                offset = mean[c] / std[c]
+                for x in range(w):
+                    out[c, y, x] = img_u8[y, x, c] * scale - offset
+        return out
+
+else:
+
+    def normalize_hwc_to_chw(img_u8, mean, std, out):
+        """NumPy fallback for the fused normalization kernel"""
+        scale = (1.0 / (255.0 * std))[:, None, None]
+        np.multiply(img_u8.transpose(2, 0, 1), scale, out=out)
+        out -= (mean / std)[:, None, None]
+        return out
+
+
+if DALI_AVAILABLE:
+
+    @pipeline_def
+    def _dali_pipeline(files):
+        """Read, GPU-decode (nvJPEG), resize, crop and normalize image files"""
+        encoded, _ = fn.readers.file(files=files, name="Reader")
+        images = fn.decoders.image(encoded, device="mixed", output_type=types.RGB)
+        images = fn.resize(images, resize_shorter=256)
+        return fn.crop_mirror_normalize(
+            images,
+            crop=(224, 224),
+            dtype=types.FLOAT,
+            output_layout="CHW",
+            mean=(IMAGENET_MEAN * 255).tolist(),
+            std=(IMAGENET_STD * 255).tolist(),
+        )
+
 
 class UnifiedFeatureExtractor:
     """Extract features from images using pre-trained ResNet-50"""
@@ -23,7 +93,8 @@ class UnifiedFeatureExtractor:
         Args:
             feature_dim: Dimension of output features (default: 512)
             batch_size: Batch size for batch processing (default: 32)
-            use_amp: Use automatic mixed precision for faster inference
+            use_amp: Run in reduced precision on CUDA (BF16 where supported,
+                else FP16) for faster inference
         """
         logger.info(f"Initializing ResNet-50 feature extractor ({feature_dim}D)...")
         self.feature_dim = feature_dim
@@ -64,15 +135,243 @@ class UnifiedFeatureExtractor:
                 ),
             ]
         )
+        # Geometry stays in PIL; tensor conversion + normalization is fused
+        self.resize_crop = transforms.Compose(
+            [transforms.Resize(256), transforms.CenterCrop(224)]
+        )
+        self._buffers = threading.local()
 
         # Move to GPU if available
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = self.model.to(self.device)
-        logger.info(f"Feature extractor ready (Device: {self.device})")
+        self.dtype = torch.float32
+        if self.use_amp and self.device.type == "cuda":
+            # Half-precision weights and activations end to end; features
+            # are cast back to FP32 before normalization
+            self.dtype = (
+                torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            )
+        # NHWC lets cuDNN pick tensor-core convolution kernels
+        self.memory_format = (
+            torch.channels_last if self.device.type == "cuda" else torch.contiguous_format
+        )
+        self.model = self.model.to(
+            self.device, dtype=self.dtype, memory_format=self.memory_format
+        )
+
+        # On CUDA, resize/crop/normalize run on the GPU from uint8 pixels
+        self.gpu_preprocess = None
+        if self.device.type == "cuda" and TRANSFORMS_V2_AVAILABLE:
+            self.gpu_preprocess = v2.Compose(
+                [
+                    v2.Resize(256, antialias=True),
+                    v2.CenterCrop(224),
+                    v2.ToDtype(torch.float32, scale=True),
+                    v2.Normalize(mean=IMAGENET_MEAN.tolist(), std=IMAGENET_STD.tolist()),
+                ]
+            )
+        logger.info(f"Feature extractor ready (Device: {self.device}, {self.dtype})")
         logger.info("   Input: 224x224 RGB images")
         logger.info(f"   Output: {feature_dim}D feature vectors")
         logger.info("   Model: ResNet-50 (ImageNet pre-trained)")
 
+    def quantize_model(self):
+        """
+        Quantize the model for inference: INT8 dynamic quantization of the
+        Linear layers on CPU, FP16 weights on CUDA
+        """
+        if self.device.type == "cuda":
+            if self.dtype != torch.float32:
+                logger.info(f"Model already runs in {self.dtype}")
+                return
+            self.model = self.model.half()
+            self.dtype = torch.float16
+            logger.info("Model cast to FP16")
+        else:
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Model Linear layers quantized to INT8 (dynamic)")
+
+    def export_onnx(self, path, opset_version=17):
+        """
+        Export the model to ONNX with a dynamic batch axis
+
+        Args:
+            path: Output .onnx path
+            opset_version: ONNX opset to target
+        """
+        example = torch.zeros(1, 3, 224, 224, device=self.device, dtype=self.dtype)
+        torch.onnx.export(
+            self.model,
+            example,
+            path,
+            input_names=["input"],
+            output_names=["features"],
+            dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=opset_version,
+        )
+        logger.info(f"Model exported to ONNX: {path}")
+
+    def compile_model(self, mode="reduce-overhead"):
+        """
+        Compile the model graph with torch.compile (TorchScript trace as
+        fallback) and warm it up so the first request doesn't pay for it
+
+        Args:
+            mode: torch.compile mode
+        """
+        example = torch.zeros(1, 3, 224, 224, device=self.device, dtype=self.dtype)
+        example = example.contiguous(memory_format=self.memory_format)
+        eager_model = self.model
+
+        try:
+            self.model = torch.compile(eager_model, mode=mode)
+            # Warm up under the same grad mode as inference to avoid a recompile
+            with torch.inference_mode():
+                self.model(example)
+            logger.info(f"Model compiled with torch.compile (mode={mode})")
+            return
+        except Exception as e:
+            logger.warning(f"torch.compile failed: {e}. Trying TorchScript trace.")
+
+        try:
+            with torch.no_grad():
+                traced = torch.jit.trace(eager_model, example)
+                # Inline weights as constants and fold conv+BN; the extra
+                # graph rewrites of optimize_for_inference assume FP32
+                self.model = torch.jit.freeze(traced)
+                if self.dtype == torch.float32:
+                    self.model = torch.jit.optimize_for_inference(self.model)
+                # The profiling executor specializes over the first runs
+                for _ in range(3):
+                    self.model(example)
+            logger.info("Model traced and frozen with TorchScript")
+        except Exception as e:
+            logger.warning(f"TorchScript trace failed: {e}. Using eager model.")
+            self.model = eager_model
+
+    def _preprocess_into(self, image, out):
+        """Resize/crop ``image`` and write its normalized CHW float32 array into ``out``"""
+        pixels = np.asarray(self.resize_crop(image), dtype=np.uint8)
+        return normalize_hwc_to_chw(pixels, IMAGENET_MEAN, IMAGENET_STD, out)
+
+    def _preprocess(self, image):
+        """Preprocess a single image into a reusable per-thread buffer"""
+        out = getattr(self._buffers, "chw", None)
+        if out is None:
+            out = self._buffers.chw = np.empty((3, 224, 224), dtype=np.float32)
+        return torch.from_numpy(self._preprocess_into(image, out))
+
+    def preprocess_image(self, image):
+        """
+        Preprocess an RGB PIL image (or HWC uint8 array) into a new
+        normalized (3, 224, 224) float32 array, ready to be batched for
+        extract_batch(). On CUDA this happens on the GPU and a device
+        tensor is returned instead.
+        """
+        if self.gpu_preprocess is not None:
+            pixels = np.asarray(image, dtype=np.uint8)
+            if not pixels.flags.writeable:
+                pixels = pixels.copy()
+            pixels = torch.from_numpy(pixels).to(self.device)
+            return self.gpu_preprocess(pixels.permute(2, 0, 1))
+
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        out = np.empty((3, 224, 224), dtype=np.float32)
+        return self._preprocess_into(image, out)
+
+    def _to_device(self, batch):
+        """
+        Move a CPU batch to the model device. On CUDA it goes through a
+        per-thread pinned staging buffer so the H2D copy is asynchronous.
+        """
+        if self.device.type != "cuda" or batch.is_cuda:
+            return batch.to(self.device, dtype=self.dtype, memory_format=self.memory_format)
+        if batch.is_pinned():
+            # Caller-owned pinned buffer (see extract_batch_optimized)
+            host = batch
+        else:
+            n = batch.shape[0]
+            staging = getattr(self._buffers, "pinned", None)
+            if staging is None or staging.shape[0] < n:
+                staging = self._buffers.pinned = torch.empty(
+                    (max(n, self.batch_size), 3, 224, 224),
+                    dtype=torch.float32,
+                    pin_memory=True,
+                )
+            host = staging[:n]
+            host.copy_(batch)
+
+        # Copy in the host dtype, then cast on the GPU: a cross-device copy
+        # that also changes dtype converts on the CPU into pageable memory,
+        # which makes the transfer synchronous
+        device_batch = host.to(self.device, non_blocking=True)
+        return device_batch.to(dtype=self.dtype, memory_format=self.memory_format)
+
+    @contextlib.contextmanager
+    def _stream(self):
+        """
+        Per-thread CUDA stream context (yields None on CPU). The side stream
+        first waits on the stream it replaces, so work the caller already
+        queued there (e.g. GPU preprocessing) completes before it is read.
+        """
+        if self.device.type != "cuda":
+            yield None
+            return
+        stream = getattr(self._buffers, "stream", None)
+        if stream is None:
+            stream = self._buffers.stream = torch.cuda.Stream(device=self.device)
+        stream.wait_stream(torch.cuda.current_stream(self.device))
+        with torch.cuda.stream(stream):
+            yield stream
+
+    def extract_batch(self, batch):
+        """
+        Run the model on an already preprocessed batch
+
+        Args:
+            batch: float32 array or tensor of shape (N, 3, 224, 224), or a
+                list of preprocess_image() outputs
+
+        Returns:
+            list: List of L2-normalized feature vectors
+        """
+        return self.extract_batch_np(batch).tolist()
+
+    def extract_batch_np(self, batch):
+        """
+        Run the model on an already preprocessed batch (see extract_batch)
+
+        Returns:
+            np.ndarray: (N, feature_dim) L2-normalized float32 features
+        """
+        if isinstance(batch, (list, tuple)):
+            batch = torch.stack([torch.as_tensor(item) for item in batch])
+        elif isinstance(batch, np.ndarray):
+            batch = torch.from_numpy(batch)
+
+        # Copy and compute on this thread's stream; .cpu() waits for both,
+        # after which the staging buffer is free for the next batch
+        with self._stream() as stream, torch.inference_mode():
+            if stream is not None and batch.is_cuda:
+                # GPU-preprocessed inputs were written on the caller's stream
+                # (_stream() waits on it); keep the allocator from reusing
+                # their memory before the side stream has read them
+                batch.record_stream(stream)
+            batch = self._to_device(batch)
+
+            # Inputs are already in the model's dtype (see _to_device)
+            features = self.model(batch)
+
+            features = features.float().cpu().numpy()
+
+        # Normalize in place (row norms via one einsum pass)
+        inv_norm = 1.0 / (np.sqrt(np.einsum("ij,ij->i", features, features)) + 1e-8)
+        features *= inv_norm[:, None]
+
+        return features
+
     def extract_features(self, image):
         """
         Extract features from an image
@@ -83,6 +382,18 @@ class UnifiedFeatureExtractor:
         Returns:
             list: Feature vector (512D by default)
         """
+        return self.extract_features_np(image).tolist()
+
+    def extract_features_np(self, image):
+        """
+        Extract features from an image as an array
+
+        Args:
+            image: PIL Image or path to image
+
+        Returns:
+            np.ndarray: L2-normalized float32 feature vector
+        """
         # Load image if path is provided
         if isinstance(image, str):
             image = Image.open(image).convert("RGB")
@@ -94,21 +405,18 @@ class UnifiedFeatureExtractor:
             image = image.convert("RGB")
 
         # Preprocess image
-        image_tensor = self.preprocess(image).unsqueeze(0).to(self.device)
+        image_tensor = self._preprocess(image).unsqueeze(0)
 
         # Extract features
-        with torch.no_grad():
-            features = self.model(image_tensor)
+        with self._stream(), torch.inference_mode():
+            features = self.model(self._to_device(image_tensor))
 
-        # Convert to numpy and then to list
-        features = features.cpu().squeeze().numpy()
+            # Convert to numpy
+            features = features.float().cpu().squeeze().numpy()
 
         # Normalize features (L2 normalization for better similarity comparison)
-        features = features / (np.linalg.norm(features) + 1e-8)
-
-        # Convert to Python list
-        feature_list = features.tolist()
-        return feature_list
+        features /= np.linalg.norm(features) + 1e-8
+        return features
 
     def extract_batch_features(self, images):
         """
@@ -120,49 +428,97 @@ class UnifiedFeatureExtractor:
         Returns:
             list: List of feature vectors
         """
-        batch_tensors = []
+        return self.extract_batch(self._preprocess_batch(images))
 
-        for image in images:
+    def _preprocess_batch(self, images, out=None):
+        """Preprocess images into ``out`` (or a new array) of shape (N, 3, 224, 224)"""
+        if out is None:
+            out = np.empty((len(images), 3, 224, 224), dtype=np.float32)
+
+        for i, image in enumerate(images):
             # Load image if path
             if isinstance(image, str):
                 image = Image.open(image).convert("RGB")
             elif image.mode != "RGB":
                 image = image.convert("RGB")
 
-            # Preprocess
-            tensor = self.preprocess(image)
-            batch_tensors.append(tensor)
-
-        # Stack into batch
-        batch = torch.stack(batch_tensors).to(self.device)
-
-        # Extract features with AMP if enabled
-        with torch.no_grad():
-            if self.use_amp and torch.cuda.is_available():
-                with torch.cuda.amp.autocast():
-                    features = self.model(batch)
-            else:
-                features = self.model(batch)
-
-        # Normalize and convert to list
-        features = features.cpu().numpy()
-        norm = np.linalg.norm(features, axis=1, keepdims=True) + 1e-8
-        features = features / norm
+            # Preprocess straight into the batch array
+            self._preprocess_into(image, out[i])
 
-        return features.tolist()
+        return out
 
     def extract_batch_optimized(self, images):
         """
         Optimized batch extraction for large batches
-        Processes in chunks to avoid OOM errors
+        Processes in chunks to avoid OOM errors, preprocessing the next
+        chunk on a worker thread while the current one runs on the model.
+        On CUDA the chunks alternate between two pinned host buffers.
         """
+        if (
+            DALI_AVAILABLE
+            and self.device.type == "cuda"
+            and images
+            and all(isinstance(image, str) for image in images)
+        ):
+            try:
+                return self._extract_paths_dali(images)
+            except Exception as e:
+                logger.warning(f"DALI pipeline failed: {e}. Using PIL preprocessing.")
+
+        chunks = [
+            images[i : i + self.batch_size]
+            for i in range(0, len(images), self.batch_size)
+        ]
+        if not chunks:
+            return []
+
+        ring = None
+        if self.device.type == "cuda":
+            ring = [
+                torch.empty((self.batch_size, 3, 224, 224), pin_memory=True)
+                for _ in range(2)
+            ]
+
+        def prepare(index):
+            chunk = chunks[index]
+            if ring is None:
+                return self._preprocess_batch(chunk)
+            buffer = ring[index % 2][: len(chunk)]
+            self._preprocess_batch(chunk, out=buffer.numpy())
+            return buffer
+
         all_features = []
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = pool.submit(prepare, 0)
+            for index in range(len(chunks)):
+                batch = pending.result()
+                # extract_batch synchronizes on .cpu(), so the buffer
+                # refilled here is never one still being copied
+                if index + 1 < len(chunks):
+                    pending = pool.submit(prepare, index + 1)
+                all_features.extend(self.extract_batch(batch))
+
+        return all_features
 
-        for i in range(0, len(images), self.batch_size):
-            batch = images[i : i + self.batch_size]
-            batch_features = self.extract_batch_features(batch)
-            all_features.extend(batch_features)
+    def _extract_paths_dali(self, paths):
+        """Extract features for image files with decode and preprocessing on the GPU"""
+        pipe = _dali_pipeline(
+            files=list(paths),
+            batch_size=self.batch_size,
+            num_threads=4,
+            device_id=self.device.index or 0,
+        )
+        pipe.build()
+        loader = DALIGenericIterator(
+            pipe,
+            ["images"],
+            reader_name="Reader",
+            last_batch_policy=LastBatchPolicy.PARTIAL,
+        )
 
+        all_features = []
+        for data in loader:
+            all_features.extend(self.extract_batch(data[0]["images"]))
         return all_features
 
     def get_feature_dim(self):
@@ -1,26 +1,73 @@
-"""Create .env file with proper formatting"""
-
-env_content = """CLOUDINARY_CLOUD_NAME=ddyytqwbq
-CLOUDINARY_API_KEY=315439667751671
-CLOUDINARY_API_SECRET=J9F8TguFx9Xw9TgCyLAamS2jGF0
-PINECONE_API_KEY=pcsk_6ymDQY_CpQG5yUj1BpjFYuD1g9KyuMFzebjbP1zvYXZ1v2jM7JLnevcgeLRbJTUGZxQqAM
-PINECONE_ENVIRONMENT=us-east-1
-PINECONE_INDEX_NAME=quantum-images-prod
-FEATURE_DIMENSION=2048
-CATEGORIES=healthcare,satellite,surveillance
+"""Create .env file with proper formatting
+
+Values come from the environment, then AWS Secrets Manager (when
+ENV_SECRET_ID names a JSON secret and boto3 is installed), then the
+existing .env. Nothing is written when the result matches the current file.
 """
 
-with open('.env', 'w', encoding='utf-8') as f:
-    f.write(env_content.strip())
+import json
+import os
+from pathlib import Path
 
-print("✅ .env file created successfully!")
+from dotenv import dotenv_values
 
-# Verify
-from dotenv import load_dotenv
-import os
-load_dotenv()
+ENV_PATH = Path('.env')
+
+# Keys written to .env, with defaults for the non-secret ones
+ENV_DEFAULTS = {
+    'CLOUDINARY_CLOUD_NAME': None,
+    'CLOUDINARY_API_KEY': None,
+    'CLOUDINARY_API_SECRET': None,
+    'PINECONE_API_KEY': None,
+    'PINECONE_ENVIRONMENT': 'us-east-1',
+    'PINECONE_INDEX_NAME': 'quantum-images-prod',
+    'FEATURE_DIMENSION': '2048',
+    'CATEGORIES': 'healthcare,satellite,surveillance',
+}
+
+
+def load_secret_manager_values():
+    """Key/value pairs from the AWS Secrets Manager secret in ENV_SECRET_ID"""
+    secret_id = os.getenv('ENV_SECRET_ID')
+    if not secret_id:
+        return {}
+    try:
+        import boto3
+    except ImportError:
+        print("⚠️  ENV_SECRET_ID is set but boto3 is not installed")
+        return {}
+    secret = boto3.client('secretsmanager').get_secret_value(SecretId=secret_id)
+    return json.loads(secret['SecretString'])
+
+
+def build_env():
+    """Desired .env values, or raise if a required secret is missing"""
+    current = dotenv_values(ENV_PATH) if ENV_PATH.exists() else {}
+    secrets = load_secret_manager_values()
+
+    # Keys this script doesn't manage are kept as they are
+    desired = dict(current)
+    for key, default in ENV_DEFAULTS.items():
+        value = os.getenv(key) or secrets.get(key) or current.get(key) or default
+        if value is None:
+            raise ValueError(f"{key} is not set in the environment, secret or .env")
+        desired[key] = value
+    return current, desired
+
+
+if __name__ == '__main__':
+    current, desired = build_env()
+
+    if current == desired:
+        print("✅ .env is already up to date")
+    else:
+        ENV_PATH.write_text(
+            ''.join(f"{key}={value or ''}\n" for key, value in desired.items()),
+            encoding='utf-8'
+        )
+        print("✅ .env file created successfully!")
 
-print(f"\nCloud Name: {os.getenv('CLOUDINARY_CLOUD_NAME')}")
-print(f"API Key: {os.getenv('CLOUDINARY_API_KEY')}")
-print(f"API Secret: {os.getenv('CLOUDINARY_API_SECRET')[:10]}...")
-print(f"Pinecone: {os.getenv('PINECONE_API_KEY')[:20]}...")
+    # Verify without echoing secrets
+    print(f"\nCloud Name: {desired['CLOUDINARY_CLOUD_NAME']}")
+    for key in ('CLOUDINARY_API_KEY', 'CLOUDINARY_API_SECRET', 'PINECONE_API_KEY'):
+        print(f"{key}: set ({len(desired[key])} chars)")
@@ -0,0 +1,260 @@
+"""
+Shared helpers for the upload scripts
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ml.unified_feature_extractor import UnifiedFeatureExtractor
+from services.rate_limiter import TokenBucket
+
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):  # Package or libvips shared library missing
+    PYVIPS_AVAILABLE = False
+
+# Short side images are shrunk to while decoding; the models resize to 256
+DECODE_MIN_SIDE = 256
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+
+# Threads for image decoding and for Cloudinary/Pinecone uploads
+DECODE_WORKERS = 4
+UPLOAD_WORKERS = 16
+# Upload requests started per second (Cloudinary free tier allows ~10)
+UPLOAD_RATE = float(os.getenv('UPLOAD_RATE', '10'))
+# Images whose bytes may be held for queued or running uploads; extraction
+# outpaces the rate limit, so without a bound the whole folder piles up
+MAX_PENDING_UPLOADS = int(os.getenv('MAX_PENDING_UPLOADS', '64'))
+# Vectors per Pinecone upsert request
+UPSERT_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_feature_extractor(feature_dim: int = 2048, use_amp: bool = True) -> UnifiedFeatureExtractor:
+    """
+    Get the ResNet-50 feature extractor, built once per process
+
+    Running several categories in one process (see upload_all_v2.py) then
+    pays model loading and CUDA initialization only once.
+    """
+    return UnifiedFeatureExtractor(feature_dim=feature_dim, use_amp=use_amp)
+
+
+def iter_images(folder: Path, extensions: Iterable[str] = IMAGE_EXTENSIONS) -> List[Path]:
+    """
+    List the image files directly inside a folder
+
+    One os.scandir pass; file types come from the directory entries, so
+    no per-file stat calls are made on most filesystems.
+
+    Args:
+        folder: Directory to scan
+        extensions: Lowercase file extensions to include
+
+    Returns:
+        Image paths sorted by name
+    """
+    extensions = set(extensions)
+    with os.scandir(folder) as entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in extensions
+        )
+
+
+def decode_image(image_bytes: bytes, min_side: int = DECODE_MIN_SIDE) -> np.ndarray:
+    """
+    Decode image bytes into an RGB uint8 HWC array, shrinking large images
+    while decoding so the short side stays at least ``min_side``
+
+    Uses libvips shrink-on-load when pyvips is installed (large satellite
+    TIFFs are never fully rasterized); otherwise Pillow's JPEG draft mode.
+
+    Args:
+        image_bytes: Encoded image file contents
+        min_side: Minimum short side of the decoded image
+
+    Returns:
+        RGB pixel array of shape (H, W, 3)
+    """
+    if PYVIPS_AVAILABLE:
+        header = pyvips.Image.new_from_buffer(image_bytes, "")
+        scale = min(1.0, min_side / min(header.width, header.height))
+        image = pyvips.Image.thumbnail_buffer(
+            image_bytes,
+            max(1, round(header.width * scale)),
+            height=max(1, round(header.height * scale)),
+            size="down",
+        )
+        if image.hasalpha():
+            image = image.flatten(background=255)
+        if image.interpretation != "srgb":
+            image = image.colourspace("srgb")
+        image = image.cast("uchar")
+        return np.ndarray(
+            buffer=image.write_to_memory(),
+            dtype=np.uint8,
+            shape=(image.height, image.width, image.bands),
+        )
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('RGB', (min_side, min_side))
+    return np.asarray(image.convert('RGB'))
+
+
+def upload_images(
+    image_files: List[Path],
+    category: str,
+    feature_extractor: UnifiedFeatureExtractor,
+    cloudinary_service,
+    pinecone_service
+) -> Tuple[int, int]:
+    """
+    Upload images to Cloudinary and store their features in Pinecone
+
+    Three-stage pipeline: the next batch decodes and earlier uploads run
+    while the current batch is on the model. At most MAX_PENDING_UPLOADS
+    images wait on Cloudinary at a time, and upload starts are limited to
+    UPLOAD_RATE per second.
+
+    Args:
+        image_files: Image paths to upload
+        category: Category stored with each image and vector
+        feature_extractor: Extractor used for the 2048D features
+        cloudinary_service: Cloudinary service (pool_size >= UPLOAD_WORKERS)
+        pinecone_service: Pinecone vector service
+
+    Returns:
+        (successful, failed) image counts
+    """
+    def load(image_path):
+        """Read, decode and preprocess one image; runs on the decode pool"""
+        # One read: the same bytes are decoded here and uploaded later
+        image_bytes = image_path.read_bytes()
+        image = decode_image(image_bytes)
+        return image_bytes, feature_extractor.preprocess_image(image)
+
+    limiter = TokenBucket(UPLOAD_RATE)
+    pending_uploads = threading.BoundedSemaphore(MAX_PENDING_UPLOADS)
+
+    def publish(image_path, image_bytes):
+        """Upload one image to Cloudinary; returns its Pinecone id and metadata"""
+        try:
+            # Gates when uploads start, so waiting overlaps in-flight requests
+            limiter.acquire()
+            result = cloudinary_service.upload_image(
+                image_bytes,
+                image_path.name,
+                category
+            )
+        finally:
+            pending_uploads.release()
+        vector_id = result['public_id'].replace('/', '_')
+        metadata = {
+            'filename': image_path.name,
+            'category': category,
+            'cloudinary_url': result['secure_url']
+        }
+        return vector_id, metadata
+
+    success = 0
+    failed = 0
+
+    # Batch size per ResNet-50 forward pass: large batches keep the GPU
+    # busy, small ones bound CPU latency and memory
+    batch_size = 32 if feature_extractor.device.type == "cuda" else 8
+    batches = [
+        image_files[i:i + batch_size]
+        for i in range(0, len(image_files), batch_size)
+    ]
+    if not batches:
+        return success, failed
+
+    with ThreadPoolExecutor(DECODE_WORKERS) as decode_pool, \
+            ThreadPoolExecutor(UPLOAD_WORKERS) as upload_pool:
+
+        def submit_decode(chunk):
+            return [(path, decode_pool.submit(load, path)) for path in chunk]
+
+        def submit_upload(image_path, image_bytes):
+            # Blocks while too many uploads are queued (backpressure)
+            pending_uploads.acquire()
+            return upload_pool.submit(publish, image_path, image_bytes)
+
+        uploads = []
+        pending = submit_decode(batches[0])
+        for index, chunk in enumerate(batches):
+            decoding = pending
+            if index + 1 < len(batches):
+                pending = submit_decode(batches[index + 1])
+
+            # Collect the decoded batch, skipping unreadable files
+            loaded = []
+            for image_path, future in decoding:
+                try:
+                    loaded.append((image_path, *future.result()))
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"   Error loading {image_path.name}: {e}")
+            if not loaded:
+                continue
+
+            # Extract 2048D features for the whole batch in one forward pass
+            start = index * batch_size
+            logger.info(
+                f"\n[{start + 1}-{start + len(chunk)}/{len(image_files)}] "
+                f"🧠 Extracting 2048D features for {len(loaded)} images..."
+            )
+            try:
+                # float32 rows go to Pinecone as-is, without a list round trip
+                batch_features = feature_extractor.extract_batch_np(
+                    [array for _, _, array in loaded]
+                )
+            except Exception as e:
+                failed += len(loaded)
+                logger.error(f"   Batch feature extraction failed: {e}")
+                continue
+
+            # Upload to Cloudinary in the background
+            logger.info(f"   ☁️ Queued {len(loaded)} uploads to Cloudinary")
+            uploads.extend(
+                (image_path, features, submit_upload(image_path, image_bytes))
+                for (image_path, image_bytes, _), features in zip(loaded, batch_features)
+            )
+
+        # Store vectors in Pinecone in bulk requests as their uploads finish
+        records = []
+        for count, (image_path, features, future) in enumerate(uploads, 1):
+            try:
+                vector_id, metadata = future.result()
+                records.append((vector_id, features, metadata))
+                logger.debug(f"   {image_path.name} uploaded - ID: {vector_id}")
+            except Exception as e:
+                failed += 1
+                logger.error(f"   {image_path.name} Error: {e}")
+
+            if records and (len(records) == UPSERT_BATCH_SIZE or count == len(uploads)):
+                logger.info(
+                    f"   📊 [{count}/{len(uploads)}] Storing {len(records)} vectors in Pinecone..."
+                )
+                stored = pinecone_service.upsert_vectors(records, batch_size=UPSERT_BATCH_SIZE)
+                success += stored
+                failed += len(records) - stored
+                records = []
+
+    return success, failed
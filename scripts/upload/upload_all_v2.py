@@ -6,8 +6,19 @@ Uploads healthcare, satellite, and surveillance images with 512D ResNet-50 vecto
 import os
 import sys
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Runnable as a plain script: put the repo root (for scripts.*/services.*)
+# and backend/ (for the top-level config module) on sys.path
+ROOT = Path(__file__).resolve().parents[2]
+for path in (ROOT, ROOT / 'backend'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from config import config
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,8 +26,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# UPLOAD_PARALLEL=1 runs each category in its own worker process; with
+# UPLOAD_GPUS=0,1,2 the workers are pinned to those GPUs round-robin
+UPLOAD_PARALLEL = os.getenv('UPLOAD_PARALLEL', '0') == '1'
+UPLOAD_GPUS = [gpu for gpu in os.getenv('UPLOAD_GPUS', '').split(',') if gpu]
+
+CATEGORIES = [
+    ('healthcare', 'Healthcare (X-Ray)'),
+    ('satellite', 'Satellite'),
+    ('surveillance', 'Surveillance'),
+]
+
 def run_upload_script(script_name: str, category: str) -> bool:
-    """Run an upload script"""
+    """Run an upload script in this process (the feature extractor is shared)"""
     try:
         logger.info(f"\n{'='*60}")
         logger.info(f"Starting {category} image upload...")
@@ -24,15 +46,20 @@ def run_upload_script(script_name: str, category: str) -> bool:
         
         # Import and run the script
         if script_name == 'healthcare':
-            from upload_healthcare import main
+            from scripts.upload.upload_healthcare import upload_healthcare_images as upload
         elif script_name == 'satellite':
-            from upload_satellite import main
+            from scripts.upload.upload_satellite import upload_satellite_images as upload
         elif script_name == 'surveillance':
-            from upload_surveillance import main
+            from scripts.upload.upload_surveillance import upload_surveillance_images as upload
         else:
             raise ValueError(f"Unknown script: {script_name}")
         
-        main()
+        result = upload()
+        if result is None:
+            raise RuntimeError("No images uploaded")
+        success, failed = result
+        if success == 0 and failed:
+            raise RuntimeError(f"All {failed} images failed to upload")
         
         logger.info(f"\n{'='*60}")
         logger.info(f"✅ {category} upload completed successfully!")
@@ -43,6 +70,13 @@ def run_upload_script(script_name: str, category: str) -> bool:
         logger.error(f"❌ {category} upload failed: {e}")
         return False
 
+def run_upload_worker(script_name: str, category: str, gpu: str = None) -> bool:
+    """Run an upload script in a fresh worker process, optionally on one GPU"""
+    if gpu is not None:
+        # Set before the upload module (and torch) is imported
+        os.environ['CUDA_VISIBLE_DEVICES'] = gpu
+    return run_upload_script(script_name, category)
+
 def main():
     """Main upload orchestrator"""
     logger.info("\n" + "="*60)
@@ -52,16 +86,27 @@ def main():
     logger.info("Categories: Healthcare, Satellite, Surveillance")
     logger.info("="*60 + "\n")
     
-    results = {
-        'healthcare': False,
-        'satellite': False,
-        'surveillance': False
-    }
+    config.validate()
     
     # Upload each category
-    results['healthcare'] = run_upload_script('healthcare', 'Healthcare (X-Ray)')
-    results['satellite'] = run_upload_script('satellite', 'Satellite')
-    results['surveillance'] = run_upload_script('surveillance', 'Surveillance')
+    if UPLOAD_PARALLEL:
+        # Categories are independent; each worker loads its own extractor
+        gpus = [UPLOAD_GPUS[i % len(UPLOAD_GPUS)] if UPLOAD_GPUS else None
+                for i in range(len(CATEGORIES))]
+        with ProcessPoolExecutor(
+            max_workers=len(CATEGORIES),
+            mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            futures = {
+                name: pool.submit(run_upload_worker, name, label, gpu)
+                for (name, label), gpu in zip(CATEGORIES, gpus)
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        # Sequentially in this process, sharing one feature extractor
+        results = {
+            name: run_upload_script(name, label) for name, label in CATEGORIES
+        }
     
     # Summary
     logger.info("\n" + "="*60)
@@ -3,16 +3,19 @@ Upload Healthcare (X-ray) Images to Cloudinary and Pinecone
 Extracts 2048D features using ResNet-50 and stores in Pinecone
 """
 
-import os
 import time
 from pathlib import Path
-from PIL import Image
 import logging
 
 from config import config
-from ml.unified_feature_extractor import UnifiedFeatureExtractor
 from services.cloudinary_service import CloudinaryImageService
 from services.pinecone_service import PineconeVectorService
+from scripts.upload.common import (
+    UPLOAD_WORKERS,
+    get_feature_extractor,
+    iter_images,
+    upload_images,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,10 +33,11 @@ def upload_healthcare_images():
     
     # Initialize
     logger.info("\nInitializing ResNet-50 feature extractor (2048D native)...")
-    feature_extractor = UnifiedFeatureExtractor(feature_dim=2048, use_amp=True)
+    feature_extractor = get_feature_extractor(feature_dim=2048, use_amp=True)
     
     logger.info("☁️ Connecting to Cloudinary...")
-    cloudinary_service = CloudinaryImageService()
+    # One keep-alive connection per upload worker
+    cloudinary_service = CloudinaryImageService(pool_size=UPLOAD_WORKERS)
     
     logger.info("📊 Connecting to Pinecone...")
     pinecone_service = PineconeVectorService()
@@ -47,8 +51,7 @@ def upload_healthcare_images():
         return
     
     # Get image files
-    image_files = (list(images_folder.glob("*.jpeg")) + 
-                   list(images_folder.glob("*.jpg")))
+    image_files = iter_images(images_folder)
     
     if not image_files:
         logger.error(f"No images found in {images_folder}")
@@ -59,58 +62,14 @@ def upload_healthcare_images():
     logger.info(f"🏥 Category: {category}")
     logger.info(f" Model: ResNet-50 (2048D vectors)")
     
-    # Upload images
-    success = 0
-    failed = 0
     start_time = time.time()
-    
-    for idx, image_path in enumerate(image_files, 1):
-        try:
-            logger.info(f"\n[{idx}/{len(image_files)}] {image_path.name}")
-            
-            # Load image
-            image = Image.open(image_path).convert('RGB')
-            logger.info(f"   📐 Size: {image.size}")
-            
-            # Extract 2048D features
-            logger.info("   🧠 Extracting 2048D features with ResNet-50...")
-            features = feature_extractor.extract_features(image)
-            logger.info(f"   Extracted 2048D feature vector")
-            
-            # Read image as bytes
-            with open(image_path, 'rb') as f:
-                image_bytes = f.read()
-            
-            # Upload to Cloudinary
-            logger.info(f"   ☁️ Uploading to Cloudinary...")
-            result = cloudinary_service.upload_image(
-                image_bytes,
-                image_path.name,
-                category
-            )
-            
-            # Store in Pinecone
-            logger.info(f"   📊 Storing in Pinecone...")
-            vector_id = result['public_id'].replace('/', '_')
-            metadata = {
-                'filename': image_path.name,
-                'category': category,
-                'cloudinary_url': result['secure_url']
-            }
-            pinecone_service.upsert_vector(vector_id, features, metadata)
-            
-            if result:
-                success += 1
-                logger.info(f"   SUCCESS - ID: {result.get('public_id', 'N/A')[:8]}...")
-            else:
-                failed += 1
-                logger.error("   Upload failed")
-            
-            time.sleep(0.3)  # Rate limiting
-            
-        except Exception as e:
-            failed += 1
-            logger.error(f"   Error: {e}")
+    success, failed = upload_images(
+        image_files,
+        category,
+        feature_extractor,
+        cloudinary_service,
+        pinecone_service
+    )
     
     # Summary
     elapsed = time.time() - start_time
@@ -1,9 +1,39 @@
-"""Check Pinecone database contents"""
-from services.pinecone_service import PineconeVectorService
+"""Check Pinecone database contents
 
-p = PineconeVectorService()
-stats = p.get_statistics()
+Usage:
+    python -m scripts.utils.check_db                  # Query the index directly
+    python -m scripts.utils.check_db --api [URL]      # Ask a running backend
+"""
+import sys
 
-print(f"Total vectors in Pinecone: {stats.get('vectors', 0)}")
-print(f"Dimension: {stats.get('dimension', 2048)}")
-print(f"\nIndex Status: {stats.get('status', 'unknown')}")
+
+def fetch_statistics(api_url=None):
+    """Index summary from Pinecone, or from the backend's cached /api/stats"""
+    if api_url:
+        import requests
+        r = requests.get(f"{api_url.rstrip('/')}/api/stats", timeout=10)
+        r.raise_for_status()
+        return r.json()['statistics']
+
+    # describe_index_stats is a summary call; no vectors are transferred
+    from services.pinecone_service import PineconeVectorService
+    return PineconeVectorService().get_statistics()
+
+
+if __name__ == '__main__':
+    api_url = None
+    if '--api' in sys.argv:
+        i = sys.argv.index('--api')
+        api_url = sys.argv[i + 1] if len(sys.argv) > i + 1 else 'http://localhost:8000'
+
+    stats = fetch_statistics(api_url)
+
+    print('\n' + '='*50)
+    print('DATABASE STATUS')
+    print('='*50)
+    print(f"Index: {stats.get('index_name', 'unknown')}")
+    print(f"Total vectors: {stats.get('total_vector_count', 0)}")
+    print(f"Dimension: {stats.get('dimension', 2048)}")
+    if 'error' in stats:
+        print(f"Error: {stats['error']}")
+    print('='*50)
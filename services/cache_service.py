@@ -5,74 +5,503 @@ Provides caching layer to avoid redundant computations
 
 import logging
 import hashlib
-import pickle
-from typing import Optional, List
+import socket
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, List, Union, BinaryIO
+import numpy as np
+import orjson
 import redis
+from PIL import Image
+from scipy.fftpack import dct
 from config import config
 import os
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    from blake3 import blake3 as _hasher
+    HASHER_NAME = "blake3"
+except ImportError:
+    try:
+        from xxhash import xxh3_128 as _hasher
+        HASHER_NAME = "xxh3"
+    except ImportError:
+        def _hasher(data=b""):
+            return hashlib.blake2b(data, digest_size=16)
+        HASHER_NAME = "blake2b"
+
 logger = logging.getLogger(__name__)
 
+# Maximum Hamming distance between perceptual hashes treated as the same image
+PHASH_MAX_DISTANCE = 4
+
+# Redis payloads larger than this are compressed (zstd if installed, else zlib)
+COMPRESS_MIN_BYTES = 1024
+_COMPRESSED_PREFIX = b"Z"
+_ZSTD_PREFIX = b"S"
+# Raw float16 feature vectors; any other tag (e.g. legacy pickles) is a miss
+_FLOAT16_PREFIX = b"H"
+# int8 feature vectors: little-endian float32 scale, then one byte per value
+_INT8_PREFIX = b"Q"
+
+# Cache key namespace; bumped when the key hash changed from MD5. The
+# hash backend is part of it, so hosts with different optional hash
+# packages on one Redis use visibly separate namespaces
+FEATURES_PREFIX = f"features2:{HASHER_NAME}"
+
+# Idle seconds before TCP keepalive probes start on Redis connections
+_KEEPALIVE_OPTIONS = {
+    option: value
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if (option := getattr(socket, name, None)) is not None
+}
+
+# Cosine similarity at which a recent query's search results are reused
+SEMANTIC_MIN_SIMILARITY = 0.995
+
+# Counter bumped on every invalidation; search-result keys embed its value
+# so one INCR invalidates cached results for every worker at once
+SEARCH_GENERATION_KEY = "search:generation"
+
+
+def compute_phash(image: Image.Image) -> int:
+    """
+    Compute a 64-bit perceptual hash (pHash) of an image
+
+    The image is reduced to 32x32 grayscale, transformed with a 2D DCT and
+    the low-frequency 8x8 block is thresholded at its median.
+    """
+    gray = image.convert('L').resize((32, 32), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    coeffs = dct(dct(pixels, axis=0, norm='ortho'), axis=1, norm='ortho')[:8, :8]
+    bits = coeffs > np.median(coeffs)
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
 
 class RedisCache:
     """Redis-based caching for feature vectors and results"""
     
-    def __init__(self):
-        """Initialize Redis connection"""
+    def __init__(
+        self,
+        phash_capacity: int = 4096,
+        query_capacity: int = 1024,
+        quantize: bool = True
+    ):
+        """
+        Initialize Redis connection
+        
+        Args:
+            phash_capacity: Recent perceptual hashes kept for near-duplicate lookups
+            query_capacity: Recent queries kept for semantic search-result reuse
+            quantize: Store feature vectors as int8 with a per-vector scale
+                (4x smaller than float32); False keeps float16
+        """
+        self.quantize = quantize
+        self.phash_capacity = phash_capacity
+        self._recent_phashes = OrderedDict()
+        self._phash_lock = threading.Lock()
+        # Ring buffer of recent unit-norm query vectors and their result keys.
+        # It lives in this process, so each server worker only matches the
+        # queries it served itself (the hit rate is split across
+        # WEB_CONCURRENCY workers); invalidation is shared through Redis
+        self.query_capacity = query_capacity
+        self._query_vectors = None
+        self._query_keys = []
+        self._query_next = 0
+        self._query_lock = threading.Lock()
+
         redis_host = os.getenv("REDIS_HOST", "localhost")
         redis_port = int(os.getenv("REDIS_PORT", 6379))
         redis_db = int(os.getenv("REDIS_DB", 0))
+        # Unix socket path for a local Redis; skips the TCP stack entirely
+        redis_socket = os.getenv("REDIS_SOCKET")
         
         try:
-            self.redis = redis.Redis(
-                host=redis_host,
-                port=redis_port,
+            # Shared by all executor threads; waits for a free connection
+            # instead of failing when every one is in use
+            pool_kwargs = dict(
                 db=redis_db,
-                decode_responses=False,
-                socket_connect_timeout=5
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 64)),
+                timeout=5,
+                socket_connect_timeout=5,
+                health_check_interval=30
             )
+            if redis_socket:
+                pool = redis.BlockingConnectionPool(
+                    connection_class=redis.UnixDomainSocketConnection,
+                    path=redis_socket,
+                    **pool_kwargs
+                )
+                location = redis_socket
+            else:
+                # redis-py already sets TCP_NODELAY on its sockets
+                pool = redis.BlockingConnectionPool(
+                    host=redis_host,
+                    port=redis_port,
+                    socket_keepalive=True,
+                    socket_keepalive_options=_KEEPALIVE_OPTIONS,
+                    **pool_kwargs
+                )
+                location = f"{redis_host}:{redis_port}"
+            self.redis = redis.Redis(connection_pool=pool)
             self.redis.ping()
-            logger.info(f" Redis cache connected: {redis_host}:{redis_port}")
+            logger.info(f" Redis cache connected: {location} (keys: {FEATURES_PREFIX})")
         except Exception as e:
             logger.warning(f" Redis not available: {e}. Continuing without cache.")
             self.redis = None
     
-    def _generate_key(self, prefix: str, data: bytes) -> str:
-        """Generate cache key from image data"""
-        hash_digest = hashlib.md5(data).hexdigest()
-        return f"{prefix}:{hash_digest}"
+    @staticmethod
+    def _digest(data: Union[bytes, BinaryIO]) -> str:
+        """
+        128-bit hex digest of bytes or a seekable file
+
+        Uses BLAKE3 or xxh3 when installed (multi-GB/s per core), else
+        stdlib BLAKE2b; all are faster than MD5 on large images.
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return _hasher(data).hexdigest()[:32]
+        hasher = _hasher()
+        data.seek(0)
+        for chunk in iter(lambda: data.read(1 << 20), b''):
+            hasher.update(chunk)
+        data.seek(0)
+        return hasher.hexdigest()[:32]
+
+    def _generate_key(self, prefix: str, data: Union[bytes, BinaryIO]) -> str:
+        """Generate cache key from image data (bytes or a seekable file)"""
+        return f"{prefix}:{self._digest(data)}"
     
-    def get_features(self, image_bytes: bytes) -> Optional[List[float]]:
-        """Get cached features for image"""
+    def _dumps(self, value) -> bytes:
+        """Serialize a feature vector as raw int8 or float16 bytes, compressing large payloads"""
+        if self.quantize:
+            vec = np.asarray(value, dtype=np.float32)
+            scale = float(np.max(np.abs(vec))) / 127.0 if vec.size else 0.0
+            scale = scale or 1.0
+            codes = np.rint(vec * (1.0 / scale)).astype(np.int8)
+            payload = _INT8_PREFIX + struct.pack('<f', scale) + codes.tobytes()
+        else:
+            payload = _FLOAT16_PREFIX + np.asarray(value, dtype=np.float16).tobytes()
+        if len(payload) > COMPRESS_MIN_BYTES:
+            if ZSTD_AVAILABLE:
+                return _ZSTD_PREFIX + zstandard.compress(payload, 1)
+            return _COMPRESSED_PREFIX + zlib.compress(payload, 1)
+        return payload
+    
+    @staticmethod
+    def _loads(payload: bytes):
+        """
+        Deserialize a value written by ``_dumps``
+        
+        int8 vectors are dequantized to float32. float16 vectors come back
+        as a read-only view over the payload, without copying. Entries in
+        any other format, such as pickles from older versions (or zstd
+        payloads when zstandard is not installed), are treated as misses
+        and rewritten on the next set; they are never unpickled.
+        """
+        if payload[:1] == _ZSTD_PREFIX:
+            if not ZSTD_AVAILABLE:
+                return None
+            payload = zstandard.decompress(payload[1:])
+        elif payload[:1] == _COMPRESSED_PREFIX:
+            payload = zlib.decompress(payload[1:])
+        if payload[:1] == _INT8_PREFIX:
+            (scale,) = struct.unpack_from('<f', payload, 1)
+            codes = np.frombuffer(payload, dtype=np.int8, offset=5)
+            return codes.astype(np.float32) * np.float32(scale)
+        if payload[:1] == _FLOAT16_PREFIX:
+            return np.frombuffer(payload, dtype=np.float16, offset=1)
+        return None
+    
+    def _get(self, cache_key: str):
+        """Read a value from Redis"""
         if not self.redis:
             return None
-        
+        cached = self.redis.get(cache_key)
+        return self._loads(cached) if cached else None
+    
+    def _set(self, cache_key: str, value, ttl: int) -> bool:
+        """Write a value to Redis with TTL"""
+        if not self.redis:
+            return False
+        self.redis.setex(cache_key, ttl, self._dumps(value))
+        return True
+    
+    def _get_many(self, cache_keys: List[str]) -> list:
+        """Read several values from Redis in one MGET round-trip"""
+        if not self.redis or not cache_keys:
+            return [None] * len(cache_keys)
+        return [
+            self._loads(cached) if cached else None
+            for cached in self.redis.mget(cache_keys)
+        ]
+    
+    def _set_many(self, items: list, ttl: int) -> bool:
+        """Write several (key, value) pairs with TTL in one pipelined round-trip"""
+        if not self.redis or not items:
+            return False
+        pipe = self.redis.pipeline(transaction=False)
+        for cache_key, value in items:
+            pipe.setex(cache_key, ttl, self._dumps(value))
+        pipe.execute()
+        return True
+    
+    def get_features(self, image_bytes: Union[bytes, BinaryIO]) -> Optional[np.ndarray]:
+        """Get cached features for image"""
         try:
-            cache_key = self._generate_key("features", image_bytes)
-            cached = self.redis.get(cache_key)
+            cache_key = self._generate_key(FEATURES_PREFIX, image_bytes)
+            features = self._get(cache_key)
             
-            if cached:
+            if features is not None:
                 logger.info(f" Cache HIT: {cache_key[:20]}...")
-                return pickle.loads(cached)
             
-            return None
+            return features
         except Exception as e:
             logger.error(f"Cache get error: {e}")
             return None
     
-    def set_features(self, image_bytes: bytes, features: List[float], ttl: int = 86400) -> bool:
+    def set_features(
+        self,
+        image_bytes: Union[bytes, BinaryIO],
+        features: List[float],
+        ttl: int = 86400
+    ) -> bool:
         """Cache features with TTL"""
-        if not self.redis:
+        try:
+            cache_key = self._generate_key(FEATURES_PREFIX, image_bytes)
+            return self._set(cache_key, features, ttl)
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
             return False
+    
+    def get_features_bulk(
+        self,
+        images: List[Union[bytes, BinaryIO]]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Get cached features for many images with a single Redis MGET
         
+        Args:
+            images: Image bytes or seekable files
+            
+        Returns:
+            Features per image, None where not cached
+        """
         try:
-            cache_key = self._generate_key("features", image_bytes)
-            self.redis.setex(cache_key, ttl, pickle.dumps(features))
-            return True
+            cache_keys = [self._generate_key(FEATURES_PREFIX, image) for image in images]
+            features = self._get_many(cache_keys)
+            hits = sum(f is not None for f in features)
+            if hits:
+                logger.info(f" Cache HIT: {hits}/{len(images)} (bulk)")
+            return features
         except Exception as e:
-            logger.error(f"Cache set error: {e}")
+            logger.error(f"Cache bulk get error: {e}")
+            return [None] * len(images)
+    
+    def set_features_bulk(
+        self,
+        items: List[tuple],
+        ttl: int = 86400
+    ) -> bool:
+        """
+        Cache features for many images in one pipelined round-trip
+        
+        Args:
+            items: (image bytes or seekable file, features) pairs
+            ttl: Time to live in seconds
+        """
+        try:
+            return self._set_many(
+                [(self._generate_key(FEATURES_PREFIX, image), features) for image, features in items],
+                ttl
+            )
+        except Exception as e:
+            logger.error(f"Cache bulk set error: {e}")
             return False
     
+    def _remember_phash(self, phash: int):
+        with self._phash_lock:
+            self._recent_phashes[phash] = None
+            self._recent_phashes.move_to_end(phash)
+            while len(self._recent_phashes) > self.phash_capacity:
+                self._recent_phashes.popitem(last=False)
+
+    def _nearest_phashes(self, phash: int, max_distance: int) -> List[int]:
+        """Recently seen phashes within ``max_distance``, nearest first"""
+        with self._phash_lock:
+            if not self._recent_phashes:
+                return []
+            known = np.fromiter(
+                self._recent_phashes, dtype=np.uint64, count=len(self._recent_phashes)
+            )
+        xor = known ^ np.uint64(phash)
+        distances = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+        order = np.argsort(distances, kind='stable')
+        return [int(known[i]) for i in order if distances[i] <= max_distance]
+
+    def get_features_phash(
+        self,
+        phash: int,
+        max_distance: int = PHASH_MAX_DISTANCE
+    ) -> Optional[np.ndarray]:
+        """Get cached features for a near-duplicate image by perceptual hash"""
+        try:
+            candidates = [phash] + [
+                h for h in self._nearest_phashes(phash, max_distance) if h != phash
+            ]
+            for candidate in candidates:
+                cache_key = f"phash:{candidate:016x}"
+                features = self._get(cache_key)
+                if features is not None:
+                    logger.info(f" Cache HIT (phash): {cache_key}")
+                    self._remember_phash(candidate)
+                    return features
+
+            return None
+        except Exception as e:
+            logger.error(f"Cache phash get error: {e}")
+            return None
+
+    def set_features_phash(self, phash: int, features: List[float], ttl: int = 86400) -> bool:
+        """Cache features under a perceptual hash with TTL"""
+        try:
+            self._remember_phash(phash)
+            return self._set(f"phash:{phash:016x}", features, ttl)
+        except Exception as e:
+            logger.error(f"Cache phash set error: {e}")
+            return False
+
+    @staticmethod
+    def _unit(features) -> np.ndarray:
+        vec = np.asarray(features, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _remember_query(self, vec: np.ndarray, key: str):
+        with self._query_lock:
+            if self._query_vectors is None or self._query_vectors.shape[1] != vec.shape[0]:
+                self._query_vectors = np.zeros((self.query_capacity, vec.shape[0]), dtype=np.float32)
+                self._query_keys = [None] * self.query_capacity
+                self._query_next = 0
+            slot = self._query_next
+            self._query_vectors[slot] = vec
+            self._query_keys[slot] = key
+            self._query_next = (slot + 1) % self.query_capacity
+
+    def search_generation(self) -> Optional[int]:
+        """
+        Current search-result generation, or None without Redis
+
+        Read it before running a search and pass it to set_search_results,
+        so results computed across an invalidation are stored as stale.
+        """
+        if not self.redis:
+            return None
+        try:
+            return int(self.redis.get(SEARCH_GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.error(f"Cache search generation error: {e}")
+            return None
+
+    def get_search_results(
+        self,
+        features: Union[np.ndarray, List[float]],
+        min_similarity: float = SEMANTIC_MIN_SIMILARITY
+    ) -> Optional[list]:
+        """
+        Get cached search results for a query that nearly matches a recent one
+
+        Only queries cached by this process are matched (see __init__).
+
+        Args:
+            features: Query feature vector
+            min_similarity: Minimum cosine similarity to a recent query
+
+        Returns:
+            Cached results, or None on a miss
+        """
+        if not self.redis or self._query_vectors is None:
+            return None
+        try:
+            with self._query_lock:
+                similarities = self._query_vectors @ self._unit(features)
+                matches = np.flatnonzero(similarities >= min_similarity)
+                if matches.size == 0:
+                    return None
+                # Newest match first: an entry from an older generation
+                # must not shadow one stored after the invalidation
+                ages = (self._query_next - 1 - matches) % self.query_capacity
+                best = int(matches[np.argmin(ages)])
+                key = self._query_keys[best]
+
+            # Results stored before another worker's invalidation are
+            # under an older generation and read back as a miss
+            generation, key = key
+            cache_key = f"search:{generation}:{key}"
+            current, cached = self.redis.mget(SEARCH_GENERATION_KEY, cache_key)
+            if cached is None or int(current or 0) != generation:
+                return None
+            logger.info(f" Cache HIT (semantic, {similarities[best]:.4f}): {cache_key[:27]}...")
+            return orjson.loads(cached)
+        except Exception as e:
+            logger.error(f"Cache search get error: {e}")
+            return None
+
+    def set_search_results(
+        self,
+        features: Union[np.ndarray, List[float]],
+        results: list,
+        generation: Optional[int] = None,
+        ttl: int = 300
+    ) -> bool:
+        """
+        Cache search results for a query; keep the TTL short since the index changes
+
+        Args:
+            features: Query feature vector
+            results: Formatted search results
+            generation: search_generation() read before the search ran; if
+                an invalidation happened meanwhile, the results read back
+                as a miss. Read now when omitted.
+            ttl: Time to live in seconds
+        """
+        if not self.redis:
+            return False
+        try:
+            vec = self._unit(features)
+            key = self._digest(vec.tobytes())
+            if generation is None:
+                generation = self.search_generation()
+                if generation is None:
+                    return False
+            self.redis.setex(f"search:{generation}:{key}", ttl, orjson.dumps(results))
+            self._remember_query(vec, (generation, key))
+            return True
+        except Exception as e:
+            logger.error(f"Cache search set error: {e}")
+            return False
+
+    def clear_search_results(self):
+        """
+        Invalidate cached search results in every worker, e.g. after new
+        vectors are stored, by bumping the shared generation counter
+        """
+        with self._query_lock:
+            if self._query_vectors is not None:
+                self._query_vectors.fill(0)
+        if not self.redis:
+            return
+        try:
+            self.redis.incr(SEARCH_GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Cache search clear error: {e}")
+
     def get_stats(self) -> dict:
         """Get cache statistics"""
         if not self.redis:
@@ -98,11 +527,89 @@ class RedisCache:
             }
 
 
+class TieredCache(RedisCache):
+    """
+    Two-tier cache: an in-process LRU (L1) in front of Redis (L2)
+    
+    L1 serves repeat lookups without a network round-trip; L2 is shared
+    across workers and survives restarts. L1 keeps working when Redis is
+    unavailable.
+    """
+    
+    def __init__(self, l1_size: int = 1024, **kwargs):
+        self.l1_size = l1_size
+        self._l1 = OrderedDict()
+        # Lookups run on executor threads; guards the LRU bookkeeping
+        self._l1_lock = threading.Lock()
+        super().__init__(**kwargs)
+    
+    def _l1_put(self, cache_key: str, value):
+        with self._l1_lock:
+            self._l1[cache_key] = value
+            self._l1.move_to_end(cache_key)
+            while len(self._l1) > self.l1_size:
+                self._l1.popitem(last=False)
+    
+    def _get(self, cache_key: str):
+        with self._l1_lock:
+            value = self._l1.get(cache_key)
+            if value is not None:
+                self._l1.move_to_end(cache_key)
+        if value is not None:
+            return value
+        
+        value = super()._get(cache_key)
+        if value is not None:
+            self._l1_put(cache_key, value)
+        return value
+    
+    def _set(self, cache_key: str, value, ttl: int) -> bool:
+        self._l1_put(cache_key, value)
+        super()._set(cache_key, value, ttl)
+        return True
+    
+    def _get_many(self, cache_keys: List[str]) -> list:
+        with self._l1_lock:
+            values = [self._l1.get(cache_key) for cache_key in cache_keys]
+            for cache_key, value in zip(cache_keys, values):
+                if value is not None:
+                    self._l1.move_to_end(cache_key)
+        
+        # Only L1 misses go to Redis
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            fetched = super()._get_many([cache_keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                if value is not None:
+                    values[i] = value
+                    self._l1_put(cache_keys[i], value)
+        return values
+    
+    def _set_many(self, items: list, ttl: int) -> bool:
+        for cache_key, value in items:
+            self._l1_put(cache_key, value)
+        super()._set_many(items, ttl)
+        return True
+    
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats["l1_keys"] = len(self._l1)
+        stats["l1_size"] = self.l1_size
+        return stats
+
+
 _cache_instance = None
+_cache_lock = threading.Lock()
 
 
 def get_cache():
     global _cache_instance
+    # Double-checked so concurrent first callers share one Redis pool
     if _cache_instance is None:
-        _cache_instance = RedisCache()
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = TieredCache(
+                    l1_size=int(os.getenv("CACHE_L1_SIZE", 1024)),
+                    quantize=os.getenv("CACHE_QUANTIZE", "1") == "1"
+                )
     return _cache_instance
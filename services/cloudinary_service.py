@@ -5,29 +5,122 @@ Handles image upload, optimization, and delivery via CDN
 
 import os
 import logging
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, BinaryIO
 import cloudinary
 import cloudinary.uploader
-from cloudinary import CloudinaryImage
+from cloudinary import CloudinaryImage, utils
 from config import config
 
 logger = logging.getLogger(__name__)
 
 
+class _UnclosedStream:
+    """
+    File proxy whose close() and context exit leave the wrapped file open
+
+    cloudinary.uploader.upload_large() runs ``with file_io:`` on the
+    object it is given, which would close the caller's file.
+    """
+    
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def close(self):
+        pass
+
+
+@lru_cache(maxsize=10_000)
+def _build_url(
+    public_id: str,
+    width: Optional[int],
+    height: Optional[int],
+    crop: str
+) -> str:
+    """Build an optimized delivery URL; deterministic, so memoized"""
+    transformation = {
+        'quality': 'auto:good',
+        'fetch_format': 'auto'
+    }
+    
+    if width:
+        transformation['width'] = width
+    if height:
+        transformation['height'] = height
+    if width or height:
+        transformation['crop'] = crop
+    
+    return CloudinaryImage(public_id).build_url(**transformation)
+
+
 class CloudinaryImageService:
     """Service for managing images with Cloudinary"""
     
-    def __init__(self):
-        """Initialize Cloudinary with credentials from config"""
+    def __init__(self, pool_size: Optional[int] = None):
+        """
+        Initialize Cloudinary with credentials from config
+        
+        Args:
+            pool_size: Keep-alive HTTPS connections to retain for concurrent
+                uploads (default: the SDK's single pooled connection)
+        """
         cloudinary.config(
             cloud_name=config.CLOUDINARY_CLOUD_NAME,
             api_key=config.CLOUDINARY_API_KEY,
             api_secret=config.CLOUDINARY_API_SECRET,
             secure=True
         )
+        if pool_size:
+            self._resize_connection_pool(pool_size)
         logger.info("✅ Cloudinary service initialized")
         logger.info(f"   Cloud: {config.CLOUDINARY_CLOUD_NAME}")
     
+    @staticmethod
+    def _resize_connection_pool(pool_size: int):
+        """
+        Replace the uploader's shared urllib3 pool manager with one that
+        keeps ``pool_size`` connections per host. The SDK default keeps one,
+        so concurrent uploads beyond the first each pay a new TLS handshake.
+        """
+        try:
+            cloudinary.uploader._http = utils.get_http_connector(
+                cloudinary.config(),
+                dict(cloudinary.CERT_KWARGS, maxsize=pool_size, block=False)
+            )
+        except AttributeError as e:  # SDK internals changed
+            logger.warning(f"⚠️  Could not resize Cloudinary connection pool: {e}")
+    
+    @staticmethod
+    def _upload_options(filename: str, category: str) -> Dict[str, Any]:
+        """Upload parameters shared by buffered and streamed uploads"""
+        return {
+            'folder': f"quantum-images/{category}",
+            'public_id': os.path.splitext(filename)[0],
+            'resource_type': "auto",
+            'quality': "auto:good",  # Automatic quality optimization
+            'fetch_format': "auto",  # Auto WebP/AVIF conversion
+            'overwrite': True,
+            'unique_filename': True,
+            'use_filename': True
+        }
+    
+    @staticmethod
+    def _log_upload(result: Dict[str, Any]):
+        # Per-upload detail is DEBUG; bulk uploaders log progress per batch
+        logger.debug(f"✅ Upload successful: {result['public_id']}")
+        logger.debug(f"   URL: {result['secure_url']}")
+        logger.debug(f"   Format: {result['format']}")
+        logger.debug(f"   Size: {result['bytes'] / 1024:.2f} KB")
+    
     def upload_image(
         self,
         file_data: bytes,
@@ -46,26 +139,58 @@ class CloudinaryImageService:
             Dict with Cloudinary upload result
         """
         try:
-            logger.info(f"📤 Uploading {filename} to Cloudinary ({category})...")
+            logger.debug(f"📤 Uploading {filename} to Cloudinary ({category})...")
             
             # Upload with automatic optimizations
             result = cloudinary.uploader.upload(
                 file_data,
-                folder=f"quantum-images/{category}",
-                public_id=os.path.splitext(filename)[0],
-                resource_type="auto",
-                quality="auto:good",  # Automatic quality optimization
-                fetch_format="auto",  # Auto WebP/AVIF conversion
-                overwrite=True,
-                unique_filename=True,
-                use_filename=True
+                **self._upload_options(filename, category)
             )
             
-            logger.info(f"✅ Upload successful: {result['public_id']}")
-            logger.info(f"   URL: {result['secure_url']}")
-            logger.info(f"   Format: {result['format']}")
-            logger.info(f"   Size: {result['bytes'] / 1024:.2f} KB")
+            self._log_upload(result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Cloudinary upload failed: {e}")
+            raise
+    
+    def upload_image_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        category: str,
+        chunk_size: int = 6_000_000
+    ) -> Dict[str, Any]:
+        """
+        Upload image from a file object in chunks, without reading it
+        into memory first
+        
+        The stream is left open and rewound afterwards, so the caller can
+        still read it.
+        
+        Args:
+            stream: Seekable binary file object (e.g. UploadFile.file)
+            filename: Original filename
+            category: Image category (healthcare, satellite, surveillance)
+            chunk_size: Bytes per upload chunk
+            
+        Returns:
+            Dict with Cloudinary upload result
+        """
+        try:
+            logger.debug(f"📤 Streaming {filename} to Cloudinary ({category})...")
+            
+            stream.seek(0)
+            try:
+                result = cloudinary.uploader.upload_large(
+                    _UnclosedStream(stream),
+                    chunk_size=chunk_size,
+                    **self._upload_options(filename, category)
+                )
+            finally:
+                stream.seek(0)
             
+            self._log_upload(result)
             return result
             
         except Exception as e:
@@ -91,20 +216,7 @@ class CloudinaryImageService:
         Returns:
             Optimized image URL
         """
-        transformation = {
-            'quality': 'auto:good',
-            'fetch_format': 'auto'
-        }
-        
-        if width:
-            transformation['width'] = width
-        if height:
-            transformation['height'] = height
-        if width or height:
-            transformation['crop'] = crop
-        
-        url = CloudinaryImage(public_id).build_url(**transformation)
-        return url
+        return _build_url(public_id, width, height, crop)
     
     def delete_image(self, public_id: str) -> bool:
         """
@@ -3,23 +3,73 @@ Pinecone Vector Database Service
 Handles vector storage, indexing, and similarity search
 """
 
+import atexit
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 from pinecone import Pinecone, ServerlessSpec
 import numpy as np
 from config import config
 
+try:
+    # HTTP/2 + protobuf transport (pip install "pinecone[grpc]")
+    from pinecone.grpc import PineconeGRPC
+    GRPC_AVAILABLE = True
+except ImportError:
+    GRPC_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    True if a Pinecone error is a rate limit: HTTP 429 from the REST
+    client, or gRPC RESOURCE_EXHAUSTED (which has no ``status``; the
+    gRPC client may also wrap the RpcError, so its causes are checked)
+    """
+    while error is not None:
+        if getattr(error, 'status', None) == 429:
+            return True
+        code = getattr(error, 'code', None)
+        if callable(code):
+            try:
+                code = code()
+            except Exception:
+                code = None
+        if getattr(code, 'name', code) == 'RESOURCE_EXHAUSTED':
+            return True
+        if 'RESOURCE_EXHAUSTED' in str(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
 class PineconeVectorService:
     """Service for managing vectors with Pinecone"""
     
-    def __init__(self):
-        """Initialize Pinecone client and index"""
+    def __init__(self, buffer_size: int = 0):
+        """
+        Initialize Pinecone client and index
+        
+        Args:
+            buffer_size: Buffer upsert_vector() calls and send them in
+                batches of this many vectors (0 = write each immediately).
+                Buffered vectors are sent by flush(), which also runs at exit.
+        """
+        self.buffer_size = buffer_size
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        if buffer_size:
+            atexit.register(self.flush)
+        
         try:
-            # Initialize Pinecone
-            self.pc = Pinecone(api_key=config.PINECONE_API_KEY)
+            # Initialize Pinecone; gRPC avoids JSON-encoding every vector
+            use_grpc = GRPC_AVAILABLE and os.getenv('PINECONE_GRPC', '1') == '1'
+            client_class = PineconeGRPC if use_grpc else Pinecone
+            self.pc = client_class(api_key=config.PINECONE_API_KEY)
             
             # Check if index exists, create if not
             index_name = config.PINECONE_INDEX_NAME
@@ -43,7 +93,7 @@ class PineconeVectorService:
             # Get index stats
             stats = self.index.describe_index_stats()
             logger.info("✅ Pinecone service initialized")
-            logger.info(f"   Index: {index_name}")
+            logger.info(f"   Index: {index_name} ({'gRPC' if use_grpc else 'REST'})")
             logger.info(f"   Dimension: {config.FEATURE_DIMENSION}")
             logger.info(f"   Vectors: {stats.total_vector_count}")
             
@@ -51,10 +101,38 @@ class PineconeVectorService:
             logger.error(f"❌ Pinecone initialization failed: {e}")
             raise
     
+    def _prepare_vector(self, features: Union[np.ndarray, List[float]]) -> List[float]:
+        """
+        Fit a feature vector to the index dimension, L2-normalize it and
+        round it to ``config.VECTOR_DTYPE`` precision for the wire
+        
+        Unit-length vectors make the index's cosine score a plain dot
+        product, so ``min_score`` thresholds apply directly. The vector
+        stays a float32 array until the final conversion for the request
+        body; ndarray inputs are not copied before that.
+        """
+        vector = np.asarray(features, dtype=np.float32).ravel()
+        dim = config.FEATURE_DIMENSION
+        
+        # Validate dimension
+        if vector.shape[0] != dim:
+            logger.warning(f"⚠️ Feature dimension mismatch: {vector.shape[0]} != {dim}")
+            # Pad or truncate if needed
+            if vector.shape[0] < dim:
+                vector = np.pad(vector, (0, dim - vector.shape[0]))
+            else:
+                vector = vector[:dim]
+        
+        norm = float(np.sqrt(np.dot(vector, vector)))
+        if norm > 0:
+            vector = vector * np.float32(1.0 / norm)
+        
+        return vector.astype(config.VECTOR_DTYPE, copy=False).tolist()
+    
     def upsert_vector(
         self,
         vector_id: str,
-        features: List[float],
+        features: Union[np.ndarray, List[float]],
         metadata: Dict[str, Any]
     ) -> bool:
         """
@@ -62,45 +140,114 @@ class PineconeVectorService:
         
         Args:
             vector_id: Unique vector ID
-            features: Feature vector (2048D or 512D)
+            features: Feature vector (2048D or 512D, list or ndarray)
             metadata: Associated metadata (category, filename, url, etc.)
             
         Returns:
-            True if successful
+            True if successful (or buffered, see ``buffer_size``)
         """
         try:
-            # Ensure features is a list
-            if isinstance(features, np.ndarray):
-                features = features.tolist()
-            
-            # Validate dimension
-            if len(features) != config.FEATURE_DIMENSION:
-                logger.warning(f"⚠️ Feature dimension mismatch: {len(features)} != {config.FEATURE_DIMENSION}")
-                # Pad or truncate if needed
-                if len(features) < config.FEATURE_DIMENSION:
-                    features = features + [0.0] * (config.FEATURE_DIMENSION - len(features))
-                else:
-                    features = features[:config.FEATURE_DIMENSION]
+            vector = {
+                'id': vector_id,
+                'values': self._prepare_vector(features),
+                'metadata': metadata
+            }
+            
+            if self.buffer_size:
+                with self._pending_lock:
+                    self._pending.append(vector)
+                    if len(self._pending) < self.buffer_size:
+                        return True
+                    batch, self._pending = self._pending, []
+                return self._upsert_batch(batch) == len(batch)
             
             # Upsert to Pinecone
-            self.index.upsert(
-                vectors=[{
-                    'id': vector_id,
-                    'values': features,
-                    'metadata': metadata
-                }]
-            )
+            self.index.upsert(vectors=[vector])
             
-            logger.info(f"✅ Vector indexed: {vector_id}")
+            logger.debug(f"✅ Vector indexed: {vector_id}")
             return True
             
         except Exception as e:
             logger.error(f"❌ Upsert failed: {e}")
             return False
     
+    def _upsert_batch(self, vectors: List[Dict[str, Any]], max_retries: int = 5) -> int:
+        """Upsert one batch of prepared vectors, backing off exponentially when rate limited"""
+        for attempt in range(max_retries):
+            try:
+                self.index.upsert(vectors=vectors)
+                return len(vectors)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == max_retries - 1:
+                    logger.error(f"❌ Batch upsert failed ({len(vectors)} vectors): {e}")
+                    return 0
+                time.sleep(0.5 * 2 ** attempt)
+        return 0
+    
+    def _upsert_prepared(
+        self,
+        vectors: List[Dict[str, Any]],
+        batch_size: int,
+        max_workers: int
+    ) -> int:
+        """Upsert prepared vectors as concurrent batched requests"""
+        batches = [
+            vectors[i:i + batch_size]
+            for i in range(0, len(vectors), batch_size)
+        ]
+        if len(batches) <= 1 or max_workers <= 1:
+            return sum(map(self._upsert_batch, batches))
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            return sum(executor.map(self._upsert_batch, batches))
+    
+    def upsert_vectors(
+        self,
+        records: List[Tuple[str, Any, Dict[str, Any]]],
+        batch_size: int = 100,
+        max_workers: int = 4
+    ) -> int:
+        """
+        Insert or update many vectors using concurrent batched requests
+        
+        Args:
+            records: (vector_id, features, metadata) tuples
+            batch_size: Vectors per upsert request (Pinecone recommends <= 100)
+            max_workers: Concurrent upsert requests
+            
+        Returns:
+            Number of vectors upserted
+        """
+        vectors = [
+            {
+                'id': vector_id,
+                'values': self._prepare_vector(features),
+                'metadata': metadata
+            }
+            for vector_id, features, metadata in records
+        ]
+        upserted = self._upsert_prepared(vectors, batch_size, max_workers)
+        
+        logger.info(f"✅ Upserted {upserted}/{len(vectors)} vectors")
+        return upserted
+    
+    def flush(self, batch_size: int = 100, max_workers: int = 4) -> int:
+        """
+        Send vectors buffered by upsert_vector()
+        
+        Returns:
+            Number of vectors upserted
+        """
+        with self._pending_lock:
+            vectors, self._pending = self._pending, []
+        if not vectors:
+            return 0
+        upserted = self._upsert_prepared(vectors, batch_size, max_workers)
+        logger.info(f"✅ Flushed {upserted}/{len(vectors)} buffered vectors")
+        return upserted
+    
     def search(
         self,
-        query_features: List[float],
+        query_features: Union[np.ndarray, List[float]],
         top_k: int = 10,
         category_filter: Optional[str] = None,
         min_score: float = 0.0
@@ -118,16 +265,7 @@ class PineconeVectorService:
             List of similar vectors with metadata and scores
         """
         try:
-            # Ensure features is a list
-            if isinstance(query_features, np.ndarray):
-                query_features = query_features.tolist()
-            
-            # Validate dimension
-            if len(query_features) != config.FEATURE_DIMENSION:
-                if len(query_features) < config.FEATURE_DIMENSION:
-                    query_features = query_features + [0.0] * (config.FEATURE_DIMENSION - len(query_features))
-                else:
-                    query_features = query_features[:config.FEATURE_DIMENSION]
+            query_features = self._prepare_vector(query_features)
             
             # Build filter
             filter_dict = None
@@ -141,20 +279,22 @@ class PineconeVectorService:
                 vector=query_features,
                 top_k=top_k,
                 filter=filter_dict,
-                include_metadata=True
+                include_metadata=True,
+                # Only ids, scores and metadata are used; skip the vectors
+                include_values=False
             )
             
-            # Process results
+            # Process results (attribute access works for REST and gRPC responses)
             matches = []
-            for match in results['matches']:
-                score = match['score']
+            for match in results.matches:
+                score = match.score
                 
                 # Apply minimum score threshold
                 if score >= min_score:
                     matches.append({
-                        'id': match['id'],
+                        'id': match.id,
                         'score': float(score),
-                        'metadata': match.get('metadata', {})
+                        'metadata': match.metadata or {}
                     })
             
             logger.info(f"✅ Found {len(matches)} matches (threshold: {min_score})")
@@ -184,6 +324,46 @@ class PineconeVectorService:
             logger.error(f"❌ Delete failed: {e}")
             return False
     
+    def _delete_batch(self, ids: List[str], max_retries: int = 5) -> int:
+        """Delete one batch of IDs, backing off exponentially when rate limited"""
+        for attempt in range(max_retries):
+            try:
+                self.index.delete(ids=ids)
+                return len(ids)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == max_retries - 1:
+                    logger.error(f"❌ Batch delete failed ({len(ids)} ids): {e}")
+                    return 0
+                time.sleep(0.5 * 2 ** attempt)
+        return 0
+    
+    def delete_vectors(
+        self,
+        vector_ids: List[str],
+        batch_size: int = 1000,
+        max_workers: int = 8
+    ) -> int:
+        """
+        Delete many vectors using concurrent batched requests
+        
+        Args:
+            vector_ids: Vector IDs to delete
+            batch_size: IDs per delete request (Pinecone allows up to 1000)
+            max_workers: Concurrent delete requests
+            
+        Returns:
+            Number of vectors deleted
+        """
+        batches = [
+            vector_ids[i:i + batch_size]
+            for i in range(0, len(vector_ids), batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            deleted = sum(executor.map(self._delete_batch, batches))
+        
+        logger.info(f"🗑️ Deleted {deleted}/{len(vector_ids)} vectors in {len(batches)} batches")
+        return deleted
+    
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get index statistics
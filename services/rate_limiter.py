@@ -0,0 +1,42 @@
+"""
+Token Bucket Rate Limiter
+Keeps bulk uploads under a provider's request rate without fixed sleeps
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests/second with bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Initialize the bucket (full)
+
+        Args:
+            rate: Tokens added per second; 0 or less disables limiting
+            capacity: Maximum burst size (default: one second of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Take ``tokens``, sleeping only as long as the bucket is short"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,16 @@
+"""
+Shared test setup
+
+services.* and the backend import the top-level ``config`` module from
+backend/, which validates these credentials at import time. Unit tests
+never make requests with them.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+for name in ('CLOUDINARY_CLOUD_NAME', 'CLOUDINARY_API_KEY', 'CLOUDINARY_API_SECRET', 'PINECONE_API_KEY'):
+    os.environ.setdefault(name, 'test')
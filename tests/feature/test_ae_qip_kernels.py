@@ -0,0 +1,194 @@
+"""
+Equivalence tests for the AE-QIP closed-form and batched kernels
+
+The reference functions below are the original complex-state
+implementations; the optimized kernels must agree with them.
+"""
+
+import numpy as np
+import pytest
+
+import ml.quantum.ae_qip_v3 as ae_qip_v3
+from ml.quantum.ae_qip_kernels import NUMBA_AVAILABLE
+from ml.quantum.ae_qip_v3 import AEQIPAlgorithm, AmplitudeEstimation, QuantumKernels
+
+DIM = 512
+TOLERANCE = 1e-4
+
+
+def reference_fidelity(v1, v2):
+    """|<ψ1|ψ2>|² built from explicit complex states"""
+    q1 = v1 + 1j * np.sqrt(np.maximum(0, 1 - v1**2)) * 0.1
+    q2 = v2 + 1j * np.sqrt(np.maximum(0, 1 - v2**2)) * 0.1
+    return float(np.clip(np.abs(np.vdot(q1, q2))**2, 0, 1))
+
+
+def reference_phase_coherence(v1, v2):
+    """Mean cos of the phase difference, via np.angle"""
+    q1 = v1 + 1j * np.sqrt(np.maximum(0, 1 - v1**2)) * 0.1
+    q2 = v2 + 1j * np.sqrt(np.maximum(0, 1 - v2**2)) * 0.1
+    coherence = np.mean(np.cos(np.angle(q1) - np.angle(q2)))
+    return float(np.clip((coherence + 1) / 2, 0, 1))
+
+
+def reference_amplitude(classical, fidelity, precision=2**7):
+    """sin²(arcsin(sqrt(combined)) · (1 + 1/precision)), without the table"""
+    theta = np.arcsin(np.sqrt((classical + fidelity) / 2))
+    return float(np.clip(np.sin(theta * (1 + 1 / precision))**2, 0, 1))
+
+
+def reference_similarity(f1, f2):
+    """Original per-pair quantum-inspired similarity"""
+    v1 = np.array(f1, dtype=np.float64)
+    v2 = np.array(f2, dtype=np.float64)
+    v1 = v1 / (np.linalg.norm(v1) + 1e-10)
+    v2 = v2 / (np.linalg.norm(v2) + 1e-10)
+    classical = (np.dot(v1, v2) + 1) / 2
+    fidelity = reference_fidelity(v1, v2)
+    coherence = reference_phase_coherence(v1, v2)
+    combined = 0.70 * classical + 0.20 * fidelity + 0.10 * coherence
+    ae = reference_amplitude(classical, fidelity)
+    return float(np.clip(0.8 * combined + 0.2 * ae, 0, 1))
+
+
+def unit(v):
+    return (v / np.linalg.norm(v)).astype(np.float32)
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(42)
+    v1 = unit(rng.standard_normal(DIM))
+    similar = unit(0.9 * v1 + 0.1 * rng.standard_normal(DIM))
+    different = unit(rng.standard_normal(DIM))
+    return v1, similar, different
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(7)
+    query = rng.standard_normal(DIM).astype(np.float32)
+    rows = rng.standard_normal((64, DIM)).astype(np.float32)
+    # Include near-duplicates and an exact copy of the query
+    rows[:8] = query + 0.05 * rows[:8]
+    rows[8] = query
+    return query, rows
+
+
+def test_fused_all_matches_reference_kernels(vectors):
+    v1, similar, different = vectors
+    for v2 in (v1, similar, different):
+        classical, fidelity, coherence = QuantumKernels.fused_all(v1, v2)
+        v1_64, v2_64 = v1.astype(np.float64), v2.astype(np.float64)
+        assert classical == pytest.approx((v1_64 @ v2_64 + 1) / 2, abs=TOLERANCE)
+        assert fidelity == pytest.approx(reference_fidelity(v1_64, v2_64), abs=TOLERANCE)
+        assert coherence == pytest.approx(
+            reference_phase_coherence(v1_64, v2_64), abs=TOLERANCE
+        )
+
+
+def test_fidelity_kernel_matches_reference(vectors):
+    v1, similar, different = vectors
+    for v2 in (v1, similar, different):
+        assert QuantumKernels.quantum_fidelity_kernel(v1, v2) == pytest.approx(
+            reference_fidelity(v1.astype(np.float64), v2.astype(np.float64)),
+            abs=TOLERANCE
+        )
+
+
+def test_entanglement_of_product_state_is_zero(vectors):
+    v1, similar, _ = vectors
+    assert QuantumKernels.quantum_entanglement_measure(v1, similar) == 0.0
+
+
+def reference_entanglement(v1, v2):
+    """Original SVD-based entropy of outer(v1, v2); nonzero only by rounding"""
+    singular = np.linalg.svd(np.outer(v1, v2), compute_uv=False)
+    singular = singular / (np.sum(singular) + 1e-10)
+    entropy = -np.sum(singular * np.log(singular + 1e-10))
+    return float(np.clip(entropy / (np.log(len(singular)) + 1e-10), 0, 1))
+
+
+def test_entanglement_matches_svd(vectors):
+    v1, similar, different = vectors
+    for v2 in (similar, different):
+        assert QuantumKernels.quantum_entanglement_measure(v1, v2) == pytest.approx(
+            reference_entanglement(v1, v2), abs=1e-5
+        )
+
+
+def test_similarity_matches_reference(vectors):
+    algo = AEQIPAlgorithm(use_quantum_inspired=True)
+    v1, similar, different = vectors
+    for v2 in (v1, similar, different):
+        assert algo.calculate_similarity(v1.tolist(), v2.tolist()) == pytest.approx(
+            reference_similarity(v1, v2), abs=TOLERANCE
+        )
+
+
+def test_similarity_ranks_similar_above_different(vectors):
+    algo = AEQIPAlgorithm(use_quantum_inspired=True)
+    v1, similar, different = vectors
+    self_sim = algo.calculate_similarity(v1, v1)
+    assert self_sim == pytest.approx(1.0, abs=1e-3)
+    assert self_sim > algo.calculate_similarity(v1, similar) > algo.calculate_similarity(
+        v1, different
+    )
+
+
+def test_breakdown_matches_similarity(vectors):
+    algo = AEQIPAlgorithm(use_quantum_inspired=True)
+    v1, similar, _ = vectors
+    breakdown = algo.calculate_similarity_with_breakdown(v1, similar)
+    assert breakdown['similarity'] == pytest.approx(
+        algo.calculate_similarity(v1, similar), abs=1e-6
+    )
+
+
+def test_amplitude_table_matches_closed_form():
+    estimator = AmplitudeEstimation(n_precision_qubits=7)
+    for classical in np.linspace(0, 1, 37):
+        for fidelity in (0.0, 0.3, 0.77, 1.0):
+            assert estimator.estimate_amplitude(classical, fidelity) == pytest.approx(
+                reference_amplitude(classical, fidelity), abs=1e-5
+            )
+
+
+def test_amplitude_batch_matches_scalar():
+    estimator = AmplitudeEstimation()
+    classical = np.linspace(0, 1, 101)
+    fidelity = classical[::-1]
+    batch = estimator.estimate_amplitude_batch(classical, fidelity)
+    scalar = [estimator.estimate_amplitude(c, f) for c, f in zip(classical, fidelity)]
+    np.testing.assert_allclose(batch, scalar, atol=1e-9)
+
+
+@pytest.mark.parametrize('use_numba', [
+    pytest.param(True, marks=pytest.mark.skipif(
+        not NUMBA_AVAILABLE, reason='Numba not installed'
+    )),
+    False,
+])
+def test_batch_matches_per_pair(gallery, monkeypatch, use_numba):
+    monkeypatch.setattr(ae_qip_v3, 'NUMBA_AVAILABLE', use_numba)
+    algo = AEQIPAlgorithm(use_quantum_inspired=True)
+    query, rows = gallery
+
+    scores = algo.calculate_similarity_batch(query, rows)
+
+    assert scores.shape == (rows.shape[0],)
+    expected = [reference_similarity(query, row) for row in rows]
+    np.testing.assert_allclose(scores, expected, atol=TOLERANCE)
+    assert int(np.argmax(scores)) == 8
+
+
+def test_batch_accepts_prebuilt_index(gallery):
+    algo = AEQIPAlgorithm(use_quantum_inspired=True)
+    query, rows = gallery
+    index = algo.build_index(rows)
+    assert all(index[name].flags['C_CONTIGUOUS'] for name in ('vectors', 'phase', 'cos', 'sin'))
+    np.testing.assert_allclose(
+        algo.calculate_similarity_batch(query, index),
+        algo.calculate_similarity_batch(query, rows.tolist()),
+        atol=1e-6
+    )
@@ -0,0 +1,160 @@
+"""
+Tests for RedisCache's semantic search-result cache and value codec
+"""
+
+import pickle
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+import services.cache_service as cache_service
+from services.cache_service import RedisCache
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the cache uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def mget(self, *keys):
+        if len(keys) == 1 and isinstance(keys[0], list):
+            keys = keys[0]
+        return [self.data.get(key) for key in keys]
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+
+def make_cache(quantize=True, redis=None):
+    """A RedisCache wired to ``redis`` without connecting to a server"""
+    cache = RedisCache.__new__(RedisCache)
+    cache.quantize = quantize
+    cache.query_capacity = 16
+    cache._query_vectors = None
+    cache._query_keys = []
+    cache._query_next = 0
+    cache._query_lock = threading.Lock()
+    cache.redis = redis
+    return cache
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    vec = rng.standard_normal(2048).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_int8_round_trip(features):
+    cache = make_cache(quantize=True)
+    payload = cache._dumps(features)
+    decoded = RedisCache._loads(payload)
+
+    assert decoded.dtype == np.float32
+    assert decoded.shape == features.shape
+    # Quantization error is at most half a step
+    scale = np.max(np.abs(features)) / 127.0
+    assert np.max(np.abs(decoded - features)) <= scale / 2 + 1e-7
+    assert float(decoded @ features) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_int8_zero_vector():
+    cache = make_cache(quantize=True)
+    decoded = RedisCache._loads(cache._dumps(np.zeros(8, dtype=np.float32)))
+    np.testing.assert_array_equal(decoded, np.zeros(8, dtype=np.float32))
+
+
+def test_float16_round_trip(features):
+    cache = make_cache(quantize=False)
+    decoded = RedisCache._loads(cache._dumps(features))
+
+    assert decoded.dtype == np.float16
+    np.testing.assert_allclose(decoded, features, atol=1e-3)
+
+
+def test_small_payload_is_not_compressed():
+    cache = make_cache(quantize=False)
+    payload = cache._dumps(np.ones(16, dtype=np.float32))
+    assert payload[:1] == cache_service._FLOAT16_PREFIX
+
+
+def test_large_payload_is_compressed(features):
+    cache = make_cache(quantize=False)
+    payload = cache._dumps(features)
+    assert payload[:1] in (cache_service._ZSTD_PREFIX, cache_service._COMPRESSED_PREFIX)
+    np.testing.assert_array_equal(
+        RedisCache._loads(payload), features.astype(np.float16)
+    )
+
+
+def test_zlib_payload_decodes(features):
+    raw = cache_service._FLOAT16_PREFIX + features.astype(np.float16).tobytes()
+    payload = cache_service._COMPRESSED_PREFIX + zlib.compress(raw, 1)
+    np.testing.assert_array_equal(
+        RedisCache._loads(payload), features.astype(np.float16)
+    )
+
+
+def test_zstd_payload_without_zstandard_is_miss(monkeypatch):
+    monkeypatch.setattr(cache_service, 'ZSTD_AVAILABLE', False)
+    payload = cache_service._ZSTD_PREFIX + b'\x00' * 32
+    assert RedisCache._loads(payload) is None
+
+
+def test_legacy_pickle_is_miss(features):
+    assert RedisCache._loads(pickle.dumps(features.tolist())) is None
+
+
+def test_search_results_hit_for_near_duplicate(features):
+    cache = make_cache(redis=FakeRedis())
+    results = [{'id': 'a', 'similarity': 0.9}]
+    assert cache.set_search_results(features, results)
+
+    nearby = features + 1e-4 * np.ones_like(features)
+    assert cache.get_search_results(nearby) == results
+    assert cache.get_search_results(-features) is None
+
+
+def test_clear_search_results_reaches_other_workers(features):
+    redis = FakeRedis()
+    worker_a = make_cache(redis=redis)
+    worker_b = make_cache(redis=redis)
+    results = [{'id': 'a', 'similarity': 0.9}]
+    worker_a.set_search_results(features, results)
+    assert worker_a.get_search_results(features) == results
+
+    # An upload handled by another worker invalidates this worker's results
+    worker_b.clear_search_results()
+    assert worker_a.get_search_results(features) is None
+
+    # New results are cached under the new generation
+    worker_a.set_search_results(features, results)
+    assert worker_a.get_search_results(features) == results
+
+
+def test_results_from_before_an_invalidation_read_back_as_miss(features):
+    redis = FakeRedis()
+    searcher = make_cache(redis=redis)
+    uploader = make_cache(redis=redis)
+
+    # An upload lands while the search is running
+    generation = searcher.search_generation()
+    uploader.clear_search_results()
+    searcher.set_search_results(features, [{'id': 'stale'}], generation)
+
+    assert searcher.get_search_results(features) is None
+
+
+def test_feature_keys_name_the_hash_backend():
+    key = make_cache()._generate_key(cache_service.FEATURES_PREFIX, b'image')
+    assert key.startswith(f"features2:{cache_service.HASHER_NAME}:")
@@ -0,0 +1,39 @@
+"""
+Tests for streamed Cloudinary uploads
+"""
+
+import io
+
+import cloudinary.uploader
+
+from services.cloudinary_service import CloudinaryImageService
+
+RESULT = {
+    'public_id': 'quantum-images/healthcare/scan',
+    'secure_url': 'https://res.cloudinary.com/demo/scan.jpg',
+    'format': 'jpg',
+    'bytes': 10
+}
+
+
+def fake_upload_large(file_io, chunk_size, **options):
+    """Mirrors the SDK: reads in chunks inside ``with file_io:``"""
+    with file_io:
+        while file_io.read(chunk_size):
+            pass
+    return RESULT
+
+
+def test_stream_upload_leaves_file_open_and_rewound(monkeypatch):
+    monkeypatch.setattr(cloudinary.uploader, 'upload_large', fake_upload_large)
+    stream = io.BytesIO(b'x' * 100)
+    stream.seek(40)
+
+    result = CloudinaryImageService().upload_image_stream(
+        stream, 'scan.jpg', 'healthcare', chunk_size=16
+    )
+
+    assert result == RESULT
+    assert not stream.closed
+    assert stream.tell() == 0
+    assert stream.read() == b'x' * 100
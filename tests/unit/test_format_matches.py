@@ -0,0 +1,58 @@
+"""
+Tests for shaping Pinecone matches into API results
+"""
+
+from backend_server import format_matches
+
+MATCHES = [
+    {
+        'id': 'healthcare_a',
+        'score': 0.97,
+        'metadata': {
+            'filename': 'a.jpg',
+            'category': 'healthcare',
+            'cloudinary_url': 'https://res.cloudinary.com/demo/a.jpg'
+        }
+    },
+    {
+        'id': 'satellite_b',
+        'score': 0.91,
+        'metadata': {'filename': 'b.png', 'category': 'satellite'}
+    },
+]
+
+
+def test_with_category():
+    assert format_matches(MATCHES) == [
+        {
+            'id': 'healthcare_a',
+            'filename': 'a.jpg',
+            'category': 'healthcare',
+            'similarity': 0.97,
+            'image_url': 'https://res.cloudinary.com/demo/a.jpg'
+        },
+        {
+            'id': 'satellite_b',
+            'filename': 'b.png',
+            'category': 'satellite',
+            'similarity': 0.91,
+            'image_url': None
+        },
+    ]
+
+
+def test_without_category():
+    results = format_matches(MATCHES, with_category=False)
+    assert [list(r) for r in results] == [
+        ['id', 'filename', 'similarity', 'image_url']
+    ] * 2
+
+
+def test_excludes_id_and_keeps_order():
+    results = format_matches(MATCHES, exclude_id='healthcare_a')
+    assert [r['id'] for r in results] == ['satellite_b']
+
+
+def test_empty():
+    assert format_matches([]) == []
+
@@ -0,0 +1,47 @@
+"""
+Tests for the fused normalization kernel used by image preprocessing
+"""
+
+import numpy as np
+from torchvision import transforms
+
+from ml.unified_feature_extractor import (
+    IMAGENET_MEAN,
+    IMAGENET_STD,
+    normalize_hwc_to_chw,
+)
+
+
+def random_image(h=224, w=224, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def test_matches_torchvision_normalize():
+    image = random_image()
+    out = np.empty((3, 224, 224), dtype=np.float32)
+    result = normalize_hwc_to_chw(image, IMAGENET_MEAN, IMAGENET_STD, out)
+
+    expected = transforms.Normalize(IMAGENET_MEAN.tolist(), IMAGENET_STD.tolist())(
+        transforms.ToTensor()(image)
+    )
+    np.testing.assert_allclose(result, expected.numpy(), atol=1e-5)
+
+
+def test_writes_into_output_buffer():
+    out = np.empty((3, 224, 224), dtype=np.float32)
+    result = normalize_hwc_to_chw(random_image(), IMAGENET_MEAN, IMAGENET_STD, out)
+    assert result is out or np.shares_memory(result, out)
+
+
+def test_non_square_image():
+    image = random_image(h=32, w=48, seed=1)
+    out = np.empty((3, 32, 48), dtype=np.float32)
+    normalize_hwc_to_chw(image, IMAGENET_MEAN, IMAGENET_STD, out)
+    expected = (image.astype(np.float32) / 255 - IMAGENET_MEAN) / IMAGENET_STD
+    np.testing.assert_allclose(out, expected.transpose(2, 0, 1), atol=1e-5)
+
+
+def test_reused_buffer_is_fully_overwritten():
+    out = np.full((3, 224, 224), np.nan, dtype=np.float32)
+    normalize_hwc_to_chw(random_image(seed=2), IMAGENET_MEAN, IMAGENET_STD, out)
+    assert np.isfinite(out).all()
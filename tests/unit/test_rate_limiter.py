@@ -0,0 +1,106 @@
+"""
+Tests for the token bucket rate limiter
+"""
+
+import threading
+
+import pytest
+
+import services.rate_limiter as rate_limiter
+from services.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """
+    monotonic()/sleep() pair where sleeping advances time instantly
+
+    Tests use power-of-two rates so the clock arithmetic stays exact.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_burst_up_to_capacity_does_not_wait(clock):
+    bucket = TokenBucket(rate=8)
+    for _ in range(8):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_waits_only_for_missing_tokens(clock):
+    bucket = TokenBucket(rate=8)
+    for _ in range(8):
+        bucket.acquire()
+    bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(0.125)
+
+
+def test_sustained_rate(clock):
+    bucket = TokenBucket(rate=8, capacity=1)
+    for _ in range(41):
+        bucket.acquire()
+    # The first token is free; the next 40 arrive at 8/s
+    assert clock.now == pytest.approx(5.0)
+
+
+def test_refills_while_idle(clock):
+    bucket = TokenBucket(rate=8)
+    for _ in range(8):
+        bucket.acquire()
+    clock.now += 1.0
+    for _ in range(8):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=8, capacity=2)
+    clock.now += 60.0
+    for _ in range(3):
+        bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(0.125)
+
+
+def test_zero_rate_disables_limiting(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(1000):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_threads_share_the_budget():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    acquired = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(10):
+            bucket.acquire()
+            with lock:
+                acquired.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(acquired) == 40
+    assert bucket._tokens >= 0